@@ -0,0 +1,565 @@
+# Bitboard position representation and legal move generation for chess.py
+#
+# Squares are numbered row-major in the same orientation as the board lists used by chess.py:
+# square = row * 8 + col, so a8 is 0 and h1 is 63. Bit `1 << square` represents that square.
+# Moves are plain tuples (start_square, end_square, promotion) where promotion is None or
+# one of 'q', 'r', 'b', 'n'. Castling is a two square king move and en passant a pawn move onto
+# the en passant square.
+
+import random
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+WHITE, BLACK = 0, 1
+COLORS = {'white': WHITE, 'black': BLACK}
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECES = 'PNBRQKpnbrqk'
+PIECE_INDEX = {piece: index for index, piece in enumerate(PIECES)}
+PROMOTIONS = ('q', 'r', 'b', 'n')
+
+Move = Tuple[int, int, Optional[str]]
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+FILES = 'abcdefgh'
+
+CASTLING_RIGHTS = {'K': 1, 'Q': 2, 'k': 4, 'q': 8}
+# Rights lost when a piece moves from or to a square (the king and rook home squares)
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[60], CASTLING_MASKS[63], CASTLING_MASKS[56] = 15 & ~3, 15 & ~1, 15 & ~2
+CASTLING_MASKS[4], CASTLING_MASKS[7], CASTLING_MASKS[0] = 15 & ~12, 15 & ~4, 15 & ~8
+# Per color: (right, king start, king end, rook start, squares that must be empty, squares the king crosses)
+CASTLES = (
+    ((1, 60, 62, 63, (1 << 61) | (1 << 62), (61, 62)),
+     (2, 60, 58, 56, (1 << 59) | (1 << 58) | (1 << 57), (59, 58))),
+    ((4, 4, 6, 7, (1 << 5) | (1 << 6), (5, 6)),
+     (8, 4, 2, 0, (1 << 3) | (1 << 2) | (1 << 1), (3, 2))),
+)
+# Compact encoding used by Position.to_bytes: 4 bit piece codes, two squares per byte, then
+# flags (castling rights, black to move), en passant square (255 for none), halfmove and fullmove
+PIECE_CODES = {piece: code for code, piece in enumerate('.' + PIECES)}
+_STATE_FORMAT = '<BBBH'
+POSITION_BYTES = 32 + struct.calcsize(_STATE_FORMAT)
+
+# King destination -> (rook start, rook end)
+CASTLING_ROOKS = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+
+# Zobrist keys. The generator is seeded so keys are stable across processes and runs.
+_zobrist_random = random.Random(0x5EED)
+ZOBRIST_PIECES = [[_zobrist_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+# No castling rights hashes to 0 so a freshly built Position needs no castling term
+ZOBRIST_CASTLING = [0] + [_zobrist_random.getrandbits(64) for _ in range(15)]
+ZOBRIST_EP_FILE = [_zobrist_random.getrandbits(64) for _ in range(8)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+
+
+def _leaper_table(offsets) -> List[int]:
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        bb = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                bb |= 1 << (r * 8 + c)
+        table.append(bb)
+    return table
+
+
+def _ray_table(dr, dc) -> List[int]:
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        bb = 0
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            bb |= 1 << (r * 8 + c)
+            r, c = r + dr, c + dc
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _leaper_table([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# White pawns move towards row 0, black pawns towards row 7
+PAWN_ATTACKS = (_leaper_table([(-1, -1), (-1, 1)]), _leaper_table([(1, -1), (1, 1)]))
+
+# Each ray is stored with a flag telling whether it walks towards higher square numbers, so the
+# first blocker is the lowest set bit (positive ray) or the highest set bit (negative ray).
+ROOK_RAYS = tuple((_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)))
+BISHOP_RAYS = tuple((_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in ((-1, -1), (-1, 1), (1, -1), (1, 1)))
+
+# Squares a queen could reach from each square on an empty board. A piece outside these lines
+# cannot be pinned against a king standing on that square.
+QUEEN_LINES = [
+    sum(rays[square] for rays, _ in ROOK_RAYS + BISHOP_RAYS) for square in range(64)
+]
+
+
+def _sliding_attacks(square: int, occupied: int, rays) -> int:
+    attacks = 0
+    for table, positive in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return _sliding_attacks(square, occupied, ROOK_RAYS)
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return _sliding_attacks(square, occupied, BISHOP_RAYS)
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    return rook_attacks(square, occupied) | bishop_attacks(square, occupied)
+
+
+def iter_squares(bb: int) -> Iterator[int]:
+    while bb:
+        bit = bb & -bb
+        yield bit.bit_length() - 1
+        bb ^= bit
+
+
+def square_name(square: int) -> str:
+    return FILES[square % 8] + str(8 - square // 8)
+
+
+def parse_square(name: str) -> int:
+    if len(name) != 2 or name[0] not in FILES or name[1] not in '12345678':
+        raise ValueError(f"Invalid square: {name!r}")
+    return (8 - int(name[1])) * 8 + FILES.index(name[0])
+
+
+def move_to_uci(move: Move) -> str:
+    start, end, promotion = move
+    return square_name(start) + square_name(end) + (promotion or '')
+
+
+def parse_uci(text: str) -> Move:
+    text = text.strip().lower()
+    if len(text) not in (4, 5) or (len(text) == 5 and text[4] not in PROMOTIONS):
+        raise ValueError(f"Invalid move: {text!r}")
+    return parse_square(text[:2]), parse_square(text[2:4]), text[4] if len(text) == 5 else None
+
+
+class Position(object):
+    """
+    Chess position stored as one bitboard per piece kind plus a 64 square mailbox.
+
+    bitboards is indexed like PIECES ('P' is 0, 'k' is 11), occupancy holds the union of the
+    white and black pieces and kings the tracked king square of each color (None when absent).
+    castling is a mask of CASTLING_RIGHTS and ep_square the square a pawn can capture onto en
+    passant. Moves are applied in place with make_move and reverted with unmake_move, which pops
+    the undo record pushed onto history.
+
+    key is the Zobrist hash of the position, kept up to date on every change. Two positions
+    share a key when they have the same pieces, side to move, castling rights and en passant
+    capture, i.e. when they count as the same position for repetition purposes.
+    """
+
+    def __init__(self, turn: str = 'white'):
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        self.squares = ['.'] * 64
+        self.kings = [None, None]
+        self.turn = turn
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove = 0
+        self.fullmove = 1
+        self.key = ZOBRIST_BLACK_TO_MOVE if turn == 'black' else 0
+        self.history = []
+        # Keys of positions played before this object was built, oldest first (see repetition_keys)
+        self.prior_keys = []
+
+    @classmethod
+    def from_board(cls, board, turn: str = 'white') -> 'Position':
+        """
+        Build a position from the 8x8 list of piece letters used by chess.py.
+        A bare board carries no castling rights or en passant square.
+        """
+        position = cls(turn)
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece != '.':
+                    position.put(piece, row * 8 + col)
+        return position
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'Position':
+        fields = fen.split()
+        if not fields:
+            raise ValueError("Empty FEN")
+        fields += ['w', '-', '-', '0', '1'][len(fields) - 1:]
+        placement, turn, castling, ep, halfmove, fullmove = fields[:6]
+        if turn not in ('w', 'b'):
+            raise ValueError(f"Invalid side to move in FEN: {turn!r}")
+
+        position = cls('white' if turn == 'w' else 'black')
+        ranks = placement.split('/')
+        if len(ranks) != 8:
+            raise ValueError(f"FEN must have 8 ranks: {fen!r}")
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                elif char in PIECE_INDEX and col < 8:
+                    position.put(char, row * 8 + col)
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN rank {rank!r}")
+            if col != 8:
+                raise ValueError(f"Invalid FEN rank {rank!r}")
+
+        if castling != '-':
+            for char in castling:
+                if char not in CASTLING_RIGHTS:
+                    raise ValueError(f"Invalid castling rights in FEN: {castling!r}")
+                position.castling |= CASTLING_RIGHTS[char]
+        position.ep_square = None if ep == '-' else parse_square(ep)
+        position.halfmove = int(halfmove)
+        position.fullmove = int(fullmove)
+        position.key = position.compute_key()
+        return position
+
+    def to_fen(self) -> str:
+        ranks = []
+        for row in range(8):
+            rank, empty = '', 0
+            for piece in self.squares[row * 8:row * 8 + 8]:
+                if piece == '.':
+                    empty += 1
+                    continue
+                if empty:
+                    rank, empty = rank + str(empty), 0
+                rank += piece
+            ranks.append(rank + (str(empty) if empty else ''))
+        castling = ''.join(char for char, right in CASTLING_RIGHTS.items() if self.castling & right) or '-'
+        ep = '-' if self.ep_square is None else square_name(self.ep_square)
+        return f"{'/'.join(ranks)} {self.turn[0]} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def to_board(self) -> List[List[str]]:
+        return [self.squares[row * 8:row * 8 + 8] for row in range(8)]
+
+    def to_bytes(self) -> bytes:
+        """POSITION_BYTES long encoding of the position without its move history"""
+        squares = self.squares
+        packed = bytes(PIECE_CODES[squares[square]] | PIECE_CODES[squares[square + 1]] << 4 for square in range(0, 64, 2))
+        flags = self.castling | (16 if self.turn == 'black' else 0)
+        ep = 255 if self.ep_square is None else self.ep_square
+        return packed + struct.pack(_STATE_FORMAT, flags, ep, min(self.halfmove, 255), self.fullmove)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Position':
+        flags, ep, halfmove, fullmove = struct.unpack_from(_STATE_FORMAT, data, 32)
+        position = cls('black' if flags & 16 else 'white')
+        for index in range(32):
+            for square, code in ((index * 2, data[index] & 15), (index * 2 + 1, data[index] >> 4)):
+                if code:
+                    position.put(PIECES[code - 1], square)
+        position.castling = flags & 15
+        position.ep_square = None if ep == 255 else ep
+        position.halfmove = halfmove
+        position.fullmove = fullmove
+        position.key = position.compute_key()
+        return position
+
+    def compute_key(self) -> int:
+        """Zobrist key computed from scratch, make_move keeps self.key equal to it incrementally"""
+        key = ZOBRIST_BLACK_TO_MOVE if self.turn == 'black' else 0
+        for square, piece in enumerate(self.squares):
+            if piece != '.':
+                key ^= ZOBRIST_PIECES[PIECE_INDEX[piece]][square]
+        return key ^ ZOBRIST_CASTLING[self.castling] ^ self._ep_key()
+
+    def _ep_key(self) -> int:
+        # The en passant square only changes the position when the side to move can capture onto it
+        if self.ep_square is None:
+            return 0
+        us = COLORS[self.turn]
+        if not PAWN_ATTACKS[us ^ 1][self.ep_square] & self.bitboards[us * 6 + PAWN]:
+            return 0
+        return ZOBRIST_EP_FILE[self.ep_square % 8]
+
+    def repetition_keys(self) -> List[int]:
+        """Keys of the earlier positions that can still be repeated (since the last capture or pawn move)"""
+        keys = self.prior_keys + [record[-1] for record in self.history]
+        return keys[max(len(keys) - self.halfmove, 0):]
+
+    def repetition_count(self) -> int:
+        """How many times the current position has occurred since the last capture or pawn move"""
+        count = 1
+        history, prior_keys = self.history, self.prior_keys
+        for back in range(2, min(self.halfmove, len(history) + len(prior_keys)) + 1, 2):
+            if back <= len(history):
+                key = history[-back][-1]
+            else:
+                key = prior_keys[len(history) - back]
+            if key == self.key:
+                count += 1
+        return count
+
+    def put(self, piece: str, square: int) -> None:
+        index = PIECE_INDEX[piece]
+        bit = 1 << square
+        self.bitboards[index] |= bit
+        self.occupancy[index // 6] |= bit
+        self.squares[square] = piece
+        self.key ^= ZOBRIST_PIECES[index][square]
+        if index % 6 == KING:
+            self._track_king(index // 6)
+
+    def remove(self, square: int) -> str:
+        piece = self.squares[square]
+        index = PIECE_INDEX[piece]
+        bit = 1 << square
+        self.bitboards[index] ^= bit
+        self.occupancy[index // 6] ^= bit
+        self.squares[square] = '.'
+        self.key ^= ZOBRIST_PIECES[index][square]
+        if index % 6 == KING:
+            self._track_king(index // 6)
+        return piece
+
+    def king_square(self, color: int) -> Optional[int]:
+        return self.kings[color]
+
+    def _track_king(self, color: int) -> None:
+        kings = self.bitboards[color * 6 + KING]
+        # Lowest square first, matching the row-major scan chess.py has always used
+        self.kings[color] = (kings & -kings).bit_length() - 1 if kings else None
+
+    def make_move(self, move: Move) -> None:
+        """Apply a move in place. The move is assumed legal, see is_legal_move/generate_legal_moves"""
+        start, end, promotion = move
+        piece = self.squares[start]
+        index = PIECE_INDEX[piece]
+        us, kind = divmod(index, 6)
+        captured_square = end
+        if kind == PAWN and end == self.ep_square:
+            captured_square = end + 8 if us == WHITE else end - 8
+        captured = self.squares[captured_square]
+
+        self.history.append(
+            (move, piece, captured, captured_square, self.castling, self.ep_square, self.halfmove, self.key)
+        )
+        self.key ^= ZOBRIST_CASTLING[self.castling] ^ self._ep_key()
+
+        if captured != '.':
+            self.remove(captured_square)
+        self.remove(start)
+        if promotion:
+            self.put(promotion.upper() if us == WHITE else promotion, end)
+        else:
+            self.put(piece, end)
+        if kind == KING and abs(end - start) == 2:
+            rook_start, rook_end = CASTLING_ROOKS[end]
+            self.put(self.remove(rook_start), rook_end)
+
+        self.castling &= CASTLING_MASKS[start] & CASTLING_MASKS[end]
+        self.ep_square = (start + end) // 2 if kind == PAWN and abs(end - start) == 16 else None
+        self.halfmove = 0 if kind == PAWN or captured != '.' else self.halfmove + 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.turn = 'black' if self.turn == 'white' else 'white'
+        self.key ^= ZOBRIST_CASTLING[self.castling] ^ self._ep_key() ^ ZOBRIST_BLACK_TO_MOVE
+
+    def unmake_move(self) -> Move:
+        """Revert the last move made with make_move and return it"""
+        move, piece, captured, captured_square, self.castling, self.ep_square, self.halfmove, key = self.history.pop()
+        start, end, _ = move
+        if piece in 'Kk' and abs(end - start) == 2:
+            rook_start, rook_end = CASTLING_ROOKS[end]
+            self.put(self.remove(rook_end), rook_start)
+        self.remove(end)
+        self.put(piece, start)
+        if captured != '.':
+            self.put(captured, captured_square)
+
+        if piece.islower():
+            self.fullmove -= 1
+        self.turn = 'black' if self.turn == 'white' else 'white'
+        self.key = key
+        return move
+
+
+def _is_attacked(position: Position, square: int, by: int, occupied: int, captured: int = 0) -> bool:
+    """
+    Whether `square` is attacked by color `by` given the occupancy `occupied`.
+    Pieces on the `captured` squares are ignored, which lets callers test a move without making it.
+    """
+    bb = position.bitboards
+    base = by * 6
+    alive = ~captured
+    if KNIGHT_ATTACKS[square] & bb[base + KNIGHT] & alive:
+        return True
+    if PAWN_ATTACKS[by ^ 1][square] & bb[base + PAWN] & alive:
+        return True
+    if KING_ATTACKS[square] & bb[base + KING] & alive:
+        return True
+    queens = bb[base + QUEEN]
+    rooks = (bb[base + ROOK] | queens) & alive
+    if rooks and rook_attacks(square, occupied) & rooks:
+        return True
+    bishops = (bb[base + BISHOP] | queens) & alive
+    if bishops and bishop_attacks(square, occupied) & bishops:
+        return True
+    return False
+
+
+def is_square_attacked(position: Position, square: int, player: str) -> bool:
+    """Whether `player` attacks `square`"""
+    occupied = position.occupancy[WHITE] | position.occupancy[BLACK]
+    return _is_attacked(position, square, COLORS[player], occupied)
+
+
+def is_in_check(position: Position, player: str = None) -> bool:
+    us = COLORS[player or position.turn]
+    king = position.king_square(us)
+    if king is None:
+        return False
+    occupied = position.occupancy[WHITE] | position.occupancy[BLACK]
+    return _is_attacked(position, king, us ^ 1, occupied)
+
+
+def _piece_targets(position: Position, square: int, us: int, occupied: int) -> int:
+    """Pseudo-legal destinations of the piece on `square`, ignoring whether the king is left in check"""
+    kind = PIECE_INDEX[position.squares[square]] % 6
+    own = position.occupancy[us]
+    if kind == PAWN:
+        capturable = position.occupancy[us ^ 1]
+        if position.ep_square is not None:
+            capturable |= 1 << position.ep_square
+        targets = PAWN_ATTACKS[us][square] & capturable
+        step, start_row = (-8, 6) if us == WHITE else (8, 1)
+        forward = square + step
+        if 0 <= forward < 64 and not occupied >> forward & 1:
+            targets |= 1 << forward
+            double = forward + step
+            if square // 8 == start_row and not occupied >> double & 1:
+                targets |= 1 << double
+        return targets
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[square] & ~own
+    if kind == BISHOP:
+        return bishop_attacks(square, occupied) & ~own
+    if kind == ROOK:
+        return rook_attacks(square, occupied) & ~own
+    if kind == QUEEN:
+        return queen_attacks(square, occupied) & ~own
+    return KING_ATTACKS[square] & ~own
+
+
+def _leaves_king_safe(position: Position, start: int, end: int, us: int, king: int, occupied: int) -> bool:
+    """Test a pseudo-legal move by looking at the occupancy it would produce, without copying anything"""
+    captured = 1 << end
+    occupied = (occupied ^ (1 << start)) | captured
+    if start == king:
+        king = end
+    elif end == position.ep_square and position.squares[start] in 'Pp':
+        # The pawn taken en passant is not on the destination square
+        captured = 1 << (end + 8 if us == WHITE else end - 8)
+        occupied ^= captured
+    return not _is_attacked(position, king, us ^ 1, occupied, captured)
+
+
+def _castling_moves(position: Position, us: int, occupied: int) -> Iterator[Move]:
+    """Castling moves for `us`, which must not currently be in check"""
+    king_piece, rook_piece = ('K', 'R') if us == WHITE else ('k', 'r')
+    for right, king_start, king_end, rook_start, empty, crossed in CASTLES[us]:
+        if not position.castling & right or occupied & empty:
+            continue
+        if position.squares[king_start] != king_piece or position.squares[rook_start] != rook_piece:
+            continue
+        if any(_is_attacked(position, square, us ^ 1, occupied) for square in crossed):
+            continue
+        yield king_start, king_end, None
+
+
+def _iter_legal_moves(position: Position, us: int, pieces: int = -1, destinations: int = -1) -> Iterator[Move]:
+    occupied = position.occupancy[WHITE] | position.occupancy[BLACK]
+    king = position.king_square(us)
+    if king is None:
+        # Boards without a king (e.g. hand-built test positions) have nothing to keep safe
+        in_check, pinnable = False, 0
+    else:
+        in_check = _is_attacked(position, king, us ^ 1, occupied)
+        pinnable = QUEEN_LINES[king]
+    last_row = 0 if us == WHITE else 7
+    pawns = position.bitboards[us * 6 + PAWN]
+    ep = position.ep_square
+
+    for start in iter_squares(position.occupancy[us] & pieces):
+        targets = _piece_targets(position, start, us, occupied) & destinations
+        # Only king moves, moves out of check, pieces on a line with the king and en passant
+        # captures (which also vacate the captured pawn's square) can expose the king
+        must_check = king is not None and (in_check or start == king or pinnable >> start & 1)
+        if pawns >> start & 1:
+            for end in iter_squares(targets):
+                if king is not None and (must_check or end == ep) and \
+                        not _leaves_king_safe(position, start, end, us, king, occupied):
+                    continue
+                if end // 8 == last_row:
+                    for promotion in PROMOTIONS:
+                        yield start, end, promotion
+                else:
+                    yield start, end, None
+        else:
+            for end in iter_squares(targets):
+                if must_check and not _leaves_king_safe(position, start, end, us, king, occupied):
+                    continue
+                yield start, end, None
+
+    if position.castling and king is not None and not in_check and pieces >> king & 1:
+        for move in _castling_moves(position, us, occupied):
+            if destinations >> move[1] & 1:
+                yield move
+
+
+def generate_legal_moves(position: Position, player: str = None, pieces: int = -1,
+                         destinations: int = -1) -> List[Move]:
+    """
+    All legal moves for `player` (defaults to the side to move). The optional pieces and destinations
+    bitboards restrict generation to moves starting and ending on those squares.
+    """
+    return list(_iter_legal_moves(position, COLORS[player or position.turn], pieces, destinations))
+
+
+def has_legal_moves(position: Position, player: str = None) -> bool:
+    for _ in _iter_legal_moves(position, COLORS[player or position.turn]):
+        return True
+    return False
+
+
+def is_legal_move(position: Position, start: int, end: int, player: str = None, check_safe: bool = True) -> bool:
+    """
+    Whether the piece on `start` can move to `end`. With check_safe=False only the piece movement
+    rules are applied and the king may be left in check.
+    """
+    us = COLORS[player or position.turn]
+    if not position.occupancy[us] >> start & 1:
+        return False
+    occupied = position.occupancy[WHITE] | position.occupancy[BLACK]
+    king = position.king_square(us)
+    if start == king and abs(end - start) == 2 and position.castling:
+        # Castling is never allowed out of, through or into check, whatever check_safe says
+        if _is_attacked(position, king, us ^ 1, occupied):
+            return False
+        return any(move[1] == end for move in _castling_moves(position, us, occupied))
+    if not _piece_targets(position, start, us, occupied) >> end & 1:
+        return False
+    if not check_safe or king is None:
+        return True
+    return _leaves_king_safe(position, start, end, us, king, occupied)
@@ -0,0 +1,327 @@
+# Local chess engine: negamax alpha-beta search with iterative deepening under a time budget
+#
+# Evaluation is material plus piece-square tables (the "simplified evaluation function" tables).
+# Moves are ordered hash move first, then captures by MVV-LVA, then killer moves, and leaf
+# nodes are extended with a captures-only quiescence search.
+#
+# parallel_search splits the root moves across a process pool. Positions cross the process
+# boundary as the compact Position.to_bytes() buffer plus the keys needed for repetition
+# detection, instead of pickling the whole Position object.
+
+import time
+from concurrent.futures import Executor
+from typing import List, NamedTuple, Optional
+
+from bitboard import PAWN, PIECE_INDEX, Move, Position, generate_legal_moves, is_in_check, iter_squares, move_to_uci
+
+MATE_SCORE = 100_000
+INFINITY = 1_000_000
+MAX_PLY = 64
+
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+
+# Tables are written from white's point of view with rank 8 first, which is exactly the square
+# numbering of bitboard.py. Black looks them up on the mirrored square (square ^ 56).
+PIECE_SQUARE_TABLES = (
+    # Pawn
+    (0, 0, 0, 0, 0, 0, 0, 0,
+     50, 50, 50, 50, 50, 50, 50, 50,
+     10, 10, 20, 30, 30, 20, 10, 10,
+     5, 5, 10, 25, 25, 10, 5, 5,
+     0, 0, 0, 20, 20, 0, 0, 0,
+     5, -5, -10, 0, 0, -10, -5, 5,
+     5, 10, 10, -20, -20, 10, 10, 5,
+     0, 0, 0, 0, 0, 0, 0, 0),
+    # Knight
+    (-50, -40, -30, -30, -30, -30, -40, -50,
+     -40, -20, 0, 0, 0, 0, -20, -40,
+     -30, 0, 10, 15, 15, 10, 0, -30,
+     -30, 5, 15, 20, 20, 15, 5, -30,
+     -30, 0, 15, 20, 20, 15, 0, -30,
+     -30, 5, 10, 15, 15, 10, 5, -30,
+     -40, -20, 0, 5, 5, 0, -20, -40,
+     -50, -40, -30, -30, -30, -30, -40, -50),
+    # Bishop
+    (-20, -10, -10, -10, -10, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 10, 10, 5, 0, -10,
+     -10, 5, 5, 10, 10, 5, 5, -10,
+     -10, 0, 10, 10, 10, 10, 0, -10,
+     -10, 10, 10, 10, 10, 10, 10, -10,
+     -10, 5, 0, 0, 0, 0, 5, -10,
+     -20, -10, -10, -10, -10, -10, -10, -20),
+    # Rook
+    (0, 0, 0, 0, 0, 0, 0, 0,
+     5, 10, 10, 10, 10, 10, 10, 5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     0, 0, 0, 5, 5, 0, 0, 0),
+    # Queen
+    (-20, -10, -10, -5, -5, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 5, 5, 5, 0, -10,
+     -5, 0, 5, 5, 5, 5, 0, -5,
+     0, 0, 5, 5, 5, 5, 0, -5,
+     -10, 5, 5, 5, 5, 5, 0, -10,
+     -10, 0, 5, 0, 0, 0, 0, -10,
+     -20, -10, -10, -5, -5, -10, -10, -20),
+    # King (middle game)
+    (-30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -20, -30, -30, -40, -40, -30, -30, -20,
+     -10, -20, -20, -20, -20, -20, -20, -10,
+     20, 20, 0, 0, 0, 0, 20, 20,
+     20, 30, 10, 0, 0, 10, 30, 20),
+)
+
+# Material plus placement of every piece on every square, from white's point of view
+PIECE_SQUARE_VALUES = [
+    [
+        PIECE_VALUES[index % 6] + PIECE_SQUARE_TABLES[index % 6][square]
+        if index < 6 else
+        -(PIECE_VALUES[index % 6] + PIECE_SQUARE_TABLES[index % 6][square ^ 56])
+        for square in range(64)
+    ]
+    for index in range(12)
+]
+
+
+class SearchResult(NamedTuple):
+    move: Optional[Move]
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+    pv: List[Move]
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def describe(self) -> str:
+        if abs(self.score) >= MATE_SCORE - MAX_PLY:
+            plies = MATE_SCORE - abs(self.score)
+            score = f"{'' if self.score > 0 else '-'}mate in {(plies + 1) // 2}"
+        else:
+            score = f"{self.score / 100:+.2f}"
+        text = f"depth {self.depth}  score {score}  nodes {self.nodes}  time {self.seconds:.2f}s  nps {self.nps:.0f}"
+        if self.pv:
+            text += f"  pv {' '.join(move_to_uci(move) for move in self.pv)}"
+        return text
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def evaluate(position: Position) -> int:
+    """Static evaluation in centipawns from the point of view of the side to move"""
+    score = 0
+    for index, bb in enumerate(position.bitboards):
+        values = PIECE_SQUARE_VALUES[index]
+        for square in iter_squares(bb):
+            score += values[square]
+    return score if position.turn == 'white' else -score
+
+
+def _victim_value(position: Position, move: Move) -> int:
+    start, end, _ = move
+    captured = position.squares[end]
+    if captured == '.':
+        # En passant is the only capture onto an empty square
+        return PIECE_VALUES[PAWN] if position.squares[start] in 'Pp' and end == position.ep_square else 0
+    return PIECE_VALUES[PIECE_INDEX[captured] % 6]
+
+
+class Engine(object):
+    """
+    Negamax alpha-beta engine. search() runs iterative deepening until the time budget runs out
+    and returns the best move of the deepest completed iteration.
+    """
+
+    def __init__(self, max_depth: int = MAX_PLY):
+        self.max_depth = max_depth
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.hash_moves = {}
+        self.iterations = []
+        self._deadline = None
+
+    def search(self, position: Position, time_ms: int = 1000, max_depth: int = None,
+               root_moves: List[Move] = None) -> SearchResult:
+        """
+        Search `position` for at most time_ms milliseconds. root_moves restricts the search to a
+        subset of the legal moves, which is how parallel_search splits the root across processes.
+        The result of every completed depth is kept in self.iterations.
+        """
+        max_depth = min(max_depth or self.max_depth, MAX_PLY)
+        start = time.perf_counter()
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.hash_moves = {}
+        self.iterations = []
+        self._deadline = None
+
+        moves = generate_legal_moves(position) if root_moves is None else list(root_moves)
+        result = SearchResult(moves[0] if moves else None, 0, 0, 0, 0.0, [])
+        if not moves or (root_moves is None and len(moves) == 1):
+            return result._replace(seconds=time.perf_counter() - start)
+
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self.search_root(position, moves, depth)
+            except SearchTimeout:
+                break
+            result = SearchResult(move, score, depth, self.nodes, time.perf_counter() - start,
+                                  self._principal_variation(position, depth))
+            self.iterations.append(result)
+            # The first iteration runs without a deadline so there is always a move to play
+            self._deadline = start + time_ms / 1000
+            if abs(score) >= MATE_SCORE - MAX_PLY or time.perf_counter() >= self._deadline:
+                break
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - start)
+
+    def search_root(self, position: Position, moves: List[Move], depth: int, alpha: int = -INFINITY,
+                    beta: int = INFINITY):
+        """Search every root move to `depth` and return (score, best move)"""
+        best_move = None
+        for move in self._order(position, moves, 0):
+            position.make_move(move)
+            try:
+                score = -self.negamax(position, depth - 1, -beta, -alpha, 1)
+            finally:
+                position.unmake_move()
+            if score > alpha or best_move is None:
+                alpha, best_move = max(alpha, score), move
+        self.hash_moves[position.key] = best_move
+        return alpha, best_move
+
+    def negamax(self, position: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self._deadline is not None and not self.nodes & 1023 and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+        if position.halfmove >= 100 or position.repetition_count() >= 2:
+            return 0
+
+        moves = generate_legal_moves(position)
+        if not moves:
+            return -MATE_SCORE + ply if is_in_check(position) else 0
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(position, alpha, beta, ply)
+
+        best_move = None
+        for move in self._order(position, moves, ply):
+            position.make_move(move)
+            try:
+                score = -self.negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                position.unmake_move()
+            if score > alpha:
+                alpha, best_move = score, move
+                if alpha >= beta:
+                    if not _victim_value(position, move) and move[2] is None:
+                        killers = self.killers[ply]
+                        if killers[0] != move:
+                            killers[0], killers[1] = move, killers[0]
+                    break
+        if best_move is not None:
+            self.hash_moves[position.key] = best_move
+        return alpha
+
+    def quiescence(self, position: Position, alpha: int, beta: int, ply: int) -> int:
+        """Only captures and promotions are searched, the side to move may also stand pat"""
+        self.nodes += 1
+        if self._deadline is not None and not self.nodes & 1023 and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+
+        stand_pat = evaluate(position)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        captures = [move for move in generate_legal_moves(position) if move[2] or _victim_value(position, move)]
+        captures.sort(key=lambda move: self._capture_order(position, move), reverse=True)
+        for move in captures:
+            position.make_move(move)
+            try:
+                score = -self.quiescence(position, -beta, -alpha, ply + 1)
+            finally:
+                position.unmake_move()
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    @staticmethod
+    def _capture_order(position: Position, move: Move) -> int:
+        """MVV-LVA: most valuable victim first, cheapest attacker first among equal victims"""
+        attacker = PIECE_INDEX[position.squares[move[0]]] % 6
+        promotion = PIECE_VALUES[PIECE_INDEX[move[2]] % 6] if move[2] else 0
+        return (_victim_value(position, move) + promotion) * 10 - PIECE_VALUES[attacker] // 100
+
+    def _order(self, position: Position, moves: List[Move], ply: int) -> List[Move]:
+        hash_move = self.hash_moves.get(position.key)
+        killers = self.killers[ply]
+
+        def order(move):
+            if move == hash_move:
+                return 1_000_000
+            victim = _victim_value(position, move)
+            if victim or move[2]:
+                return 100_000 + self._capture_order(position, move)
+            if move == killers[0]:
+                return 90_000
+            if move == killers[1]:
+                return 80_000
+            return 0
+
+        return sorted(moves, key=order, reverse=True)
+
+    def _principal_variation(self, position: Position, depth: int) -> List[Move]:
+        pv = []
+        for _ in range(depth):
+            move = self.hash_moves.get(position.key)
+            if move is None or move not in generate_legal_moves(position):
+                break
+            pv.append(move)
+            position.make_move(move)
+        for _ in pv:
+            position.unmake_move()
+        return pv
+
+
+def _search_task(data: bytes, prior_keys: List[int], moves: List[Move], time_ms: int, max_depth: int):
+    position = Position.from_bytes(data)
+    position.prior_keys = prior_keys
+    engine = Engine()
+    engine.search(position, time_ms, max_depth, root_moves=moves)
+    return engine.iterations, engine.nodes
+
+
+def parallel_search(position: Position, pool: Executor, workers: int, time_ms: int = 1000,
+                    max_depth: int = None) -> SearchResult:
+    """
+    Split the root moves round-robin over `workers` tasks, each running its own iterative deepening.
+    Scores from different depths are not comparable, so the reduction uses the deepest depth that
+    every worker completed and takes the best score at that depth.
+    """
+    start = time.perf_counter()
+    moves = generate_legal_moves(position)
+    if len(moves) <= 1:
+        return SearchResult(moves[0] if moves else None, 0, 0, 0, time.perf_counter() - start, [])
+
+    data, prior_keys = position.to_bytes(), position.repetition_keys()
+    chunks = [moves[index::workers] for index in range(min(workers, len(moves)))]
+    futures = [pool.submit(_search_task, data, prior_keys, chunk, time_ms, max_depth) for chunk in chunks]
+    outcomes = [future.result() for future in futures]
+
+    nodes = sum(worker_nodes for _, worker_nodes in outcomes)
+    depth = min(iterations[-1].depth for iterations, _ in outcomes)
+    best = max((iterations[depth - 1] for iterations, _ in outcomes), key=lambda result: result.score)
+    return best._replace(nodes=nodes, seconds=time.perf_counter() - start)
@@ -0,0 +1,192 @@
+# Perft (performance test) for the rules engine behind chess.py
+#
+# perft(position, depth) counts the leaf nodes of the legal move tree. Comparing the counts of
+# well known positions with their published values validates move generation (pawn pushes,
+# promotions, castling, en passant, pins and checks), and timing the same walk gives a
+# nodes/second figure to measure every rules engine speed-up against.
+#
+# With --workers the root moves are split across a process pool. Each task receives the root as
+# the compact Position.to_bytes() buffer plus one root move, and the counts are summed.
+#
+# Usage (from the repository root):
+#   python chess/perft.py perft --depth 4 [--fen "<fen>"] [--divide] [--workers N]
+#   python chess/perft.py check [--max-nodes 200000]
+#   python chess/perft.py bench [--max-nodes 1000000] [--workers N]
+
+import argparse
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict
+
+from bitboard import Move, Position, START_FEN, generate_legal_moves, move_to_uci
+
+# (name, FEN, {depth: nodes}) from the Chess Programming Wiki perft results page
+REFERENCE_POSITIONS = [
+    ("start", START_FEN,
+     {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+]
+
+
+def perft(position: Position, depth: int) -> int:
+    """Number of leaf nodes `depth` plies below `position`. The position is left unchanged."""
+    if depth <= 0:
+        return 1
+    moves = generate_legal_moves(position)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position: Position, depth: int) -> Dict[str, int]:
+    """Perft split by root move, keyed by the move in UCI notation. Used to locate generator bugs."""
+    result = {}
+    for move in generate_legal_moves(position):
+        position.make_move(move)
+        result[move_to_uci(move)] = perft(position, depth - 1)
+        position.unmake_move()
+    return result
+
+
+def _perft_task(data: bytes, move: Move, depth: int):
+    position = Position.from_bytes(data)
+    position.make_move(move)
+    return move, perft(position, depth - 1)
+
+
+def parallel_divide(position: Position, depth: int, pool: Executor) -> Dict[str, int]:
+    """divide() with one pool task per root move"""
+    data = position.to_bytes()
+    futures = [pool.submit(_perft_task, data, move, depth) for move in generate_legal_moves(position)]
+    return {move_to_uci(move): nodes for move, nodes in (future.result() for future in futures)}
+
+
+def parallel_perft(position: Position, depth: int, pool: Executor) -> int:
+    if depth <= 1:
+        return perft(position, depth)
+    return sum(parallel_divide(position, depth, pool).values())
+
+
+def _reference_depths(expected: Dict[int, int], max_nodes: int):
+    return [depth for depth, nodes in sorted(expected.items()) if nodes <= max_nodes]
+
+
+def check(max_nodes: int = 200_000) -> bool:
+    """Run every reference position at each depth up to `max_nodes` nodes and compare the counts"""
+    ok = True
+    for name, fen, expected in REFERENCE_POSITIONS:
+        position = Position.from_fen(fen)
+        for depth in _reference_depths(expected, max_nodes):
+            nodes = perft(position, depth)
+            status = "ok" if nodes == expected[depth] else "FAIL"
+            ok = ok and nodes == expected[depth]
+            print(f"{name:<10} depth {depth}  {nodes:>10}  expected {expected[depth]:>10}  {status}")
+    return ok
+
+
+def _worker_counts(workers: int):
+    counts, count = [], 1
+    while count < workers:
+        counts.append(count)
+        count *= 2
+    return counts + [workers]
+
+
+def bench(max_nodes: int = 1_000_000, workers: int = 1) -> int:
+    """
+    Time the deepest reference perft under `max_nodes` for every position and report nodes/second.
+    With workers > 1 every position is also run on process pools of 2, 4, ... workers to show scaling.
+    """
+    counts = _worker_counts(workers)
+    pools = {count: ProcessPoolExecutor(max_workers=count) for count in counts if count > 1}
+    total_nodes, total_seconds = 0, {count: 0.0 for count in counts}
+    try:
+        print(f"{'position':<10} {'depth':>5} {'nodes':>10}" + ''.join(f" {f'nps@{count}':>10}" for count in counts))
+        for name, fen, expected in REFERENCE_POSITIONS:
+            depths = _reference_depths(expected, max_nodes)
+            if not depths:
+                continue
+            depth = depths[-1]
+            position = Position.from_fen(fen)
+            row = f"{name:<10} {depth:>5} {expected[depth]:>10}"
+            for count in counts:
+                start = time.perf_counter()
+                if count == 1:
+                    nodes = perft(position, depth)
+                else:
+                    nodes = parallel_perft(position, depth, pools[count])
+                seconds = time.perf_counter() - start
+                if nodes != expected[depth]:
+                    print(f"{name}: expected {expected[depth]} nodes at depth {depth}, got {nodes}", file=sys.stderr)
+                total_seconds[count] += seconds
+                row += f" {nodes / seconds:>10.0f}"
+            total_nodes += expected[depth]
+            print(row)
+        print(f"{'total':<10} {'':>5} {total_nodes:>10}" +
+              ''.join(f" {total_nodes / total_seconds[count]:>10.0f}" for count in counts))
+        if workers > 1:
+            print(f"{'speedup':<10} {'':>5} {'':>10}" +
+                  ''.join(f" {total_seconds[1] / total_seconds[count]:>9.2f}x" for count in counts))
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+    return total_nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft counts and benchmarks for the chess rules engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    perft_parser = commands.add_parser("perft", help="count leaf nodes of a position")
+    perft_parser.add_argument("--fen", default=START_FEN)
+    perft_parser.add_argument("--depth", type=int, default=3)
+    perft_parser.add_argument("--divide", action="store_true", help="print the count below every root move")
+    perft_parser.add_argument("--workers", type=int, default=1, help="split the root moves over N processes")
+
+    check_parser = commands.add_parser("check", help="compare the reference positions with their known counts")
+    check_parser.add_argument("--max-nodes", type=int, default=200_000)
+
+    bench_parser = commands.add_parser("bench", help="report nodes/second over the reference positions")
+    bench_parser.add_argument("--max-nodes", type=int, default=1_000_000)
+    bench_parser.add_argument("--workers", type=int, default=1, help="also measure pools of up to N processes")
+
+    args = parser.parse_args()
+
+    if args.command == "perft":
+        position = Position.from_fen(args.fen)
+        pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+        start = time.perf_counter()
+        if args.divide:
+            counts = parallel_divide(position, args.depth, pool) if pool else divide(position, args.depth)
+            for move, nodes in sorted(counts.items()):
+                print(f"{move}: {nodes}")
+            nodes = sum(counts.values())
+        else:
+            nodes = parallel_perft(position, args.depth, pool) if pool else perft(position, args.depth)
+        seconds = time.perf_counter() - start
+        if pool:
+            pool.shutdown()
+        print(f"nodes {nodes}  time {seconds:.3f}s  nps {nodes / max(seconds, 1e-9):.0f}")
+    elif args.command == "check":
+        sys.exit(0 if check(args.max_nodes) else 1)
+    else:
+        bench(args.max_nodes, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# Streaming PGN reader and bulk game validator for the chess.py rules engine
+#
+# iter_games() reads a PGN file line by line and yields one game at a time, so archives of any
+# size are processed in constant memory. Every SAN move is resolved against the legal moves of
+# the current position and played on it, which validates the whole game.
+#
+# Usage (from the repository root):
+#   python chess/pgn.py games.pgn [--limit N] [--jsonl reports.jsonl] [--verbose]
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, TextIO
+
+from bitboard import (
+    COLORS, FILES, START_FEN, Move, Position, generate_legal_moves, has_legal_moves, is_in_check, parse_square,
+)
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+_TAG = re.compile(r'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]\s*$')
+_TOKEN = re.compile(r'''
+      \{[^}]*\}?                # comment in braces, possibly spanning lines
+    | ;[^\n]*                   # comment to the end of the line
+    | \$\d+                     # numeric annotation glyph
+    | [()]                      # start or end of a variation
+    | 1-0 | 0-1 | 1/2-1/2 | \*   # game termination markers
+    | \d+\.+                    # move number
+    | [^\s{}();]+               # a move in SAN
+''', re.VERBOSE)
+_SAN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQnbrq]))?$')
+
+
+class PGNGame(NamedTuple):
+    tags: Dict[str, str]
+    movetext: str
+
+
+class GameReport(NamedTuple):
+    number: int
+    tags: Dict[str, str]
+    plies: int
+    error: Optional[str]
+    status: Optional[str]
+    final_fen: str
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return {
+            'number': self.number,
+            'white': self.tags.get('White'),
+            'black': self.tags.get('Black'),
+            'result': self.tags.get('Result'),
+            'plies': self.plies,
+            'valid': self.valid,
+            'error': self.error,
+            'status': self.status,
+            'final_fen': self.final_fen,
+        }
+
+
+def _ends_in_comment(line: str, in_comment: bool) -> bool:
+    """Whether a brace comment is still open after `line`. Such comments may span lines and contain '['"""
+    for char in line:
+        if in_comment:
+            in_comment = char != '}'
+        elif char == '{':
+            in_comment = True
+        elif char == ';':
+            break
+    return in_comment
+
+
+def iter_games(lines: Iterable[str]) -> Iterator[PGNGame]:
+    """Split a stream of PGN lines into games without holding more than one game in memory"""
+    tags, movetext = {}, []
+    in_comment = False
+    for line in lines:
+        stripped = line.strip()
+        if not in_comment:
+            if stripped.startswith('%'):
+                continue
+            if stripped.startswith('['):
+                match = _TAG.match(stripped)
+                if match:
+                    if movetext:
+                        yield PGNGame(tags, '\n'.join(movetext))
+                        tags, movetext = {}, []
+                    tags[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+                    continue
+        if stripped:
+            movetext.append(stripped)
+            in_comment = _ends_in_comment(stripped, in_comment)
+    if tags or movetext:
+        yield PGNGame(tags, '\n'.join(movetext))
+
+
+def iter_san(movetext: str) -> Iterator[str]:
+    """Mainline SAN moves of a movetext section, skipping comments, annotations and variations"""
+    depth = 0
+    for match in _TOKEN.finditer(movetext):
+        token = match.group()
+        first = token[0]
+        if first == '(':
+            depth += 1
+        elif first == ')':
+            depth = max(depth - 1, 0)
+        elif depth or first in '{;$' or token in RESULTS or token[-1] == '.':
+            continue
+        else:
+            yield token
+
+
+def parse_san(position: Position, san: str) -> Move:
+    """
+    Resolve a SAN move (e.g. 'Nbd7', 'exd6', 'e8=Q+', 'O-O-O') against the legal moves of `position`.
+    Only moves of the named piece kind onto the destination square are generated.
+    """
+    text = san.rstrip('+#!?')
+    us = COLORS[position.turn]
+
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        king = position.king_square(us)
+        end = None if king is None else king + (2 if len(text) == 3 else -2)
+        if end is not None and 0 <= end < 64:
+            for move in generate_legal_moves(position, pieces=1 << king, destinations=1 << end):
+                return move
+        raise ValueError(f"Illegal castling {san!r}")
+
+    match = _SAN.match(text)
+    if not match:
+        raise ValueError(f"Unreadable move {san!r}")
+    piece, from_file, from_rank, destination, promotion = match.groups()
+    kind = 'PNBRQK'.index(piece or 'P')
+    end = parse_square(destination)
+    promotion = promotion.lower() if promotion else None
+
+    legal_moves = generate_legal_moves(position, pieces=position.bitboards[us * 6 + kind], destinations=1 << end)
+    candidates = [
+        move for move in legal_moves
+        if move[2] == promotion
+        and (from_file is None or move[0] % 8 == FILES.index(from_file))
+        and (from_rank is None or 8 - move[0] // 8 == int(from_rank))
+    ]
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move {san!r}")
+    return candidates[0]
+
+
+def validate_game(game: PGNGame, number: int = 0) -> GameReport:
+    """Replay a game through the rules engine and report the first illegal move, if any"""
+    fen = game.tags.get('FEN', START_FEN) if game.tags.get('SetUp', '1') == '1' else START_FEN
+    try:
+        position = Position.from_fen(fen)
+    except ValueError as e:
+        return GameReport(number, game.tags, 0, f"Invalid FEN tag: {e}", None, fen)
+
+    plies = 0
+    for san in iter_san(game.movetext):
+        try:
+            move = parse_san(position, san)
+        except ValueError as e:
+            move_number = position.fullmove if position.turn == 'white' else f"{position.fullmove}..."
+            return GameReport(number, game.tags, plies, f"{move_number}. {e}", None, position.to_fen())
+        position.make_move(move)
+        plies += 1
+
+    status = None
+    if not has_legal_moves(position):
+        status = 'checkmate' if is_in_check(position) else 'stalemate'
+    elif position.repetition_count() >= 3:
+        status = 'threefold repetition'
+    return GameReport(number, game.tags, plies, None, status, position.to_fen())
+
+
+def validate_file(stream: TextIO, limit: int = None, jsonl: TextIO = None, verbose: bool = False) -> Counter:
+    """Validate every game of a PGN stream, print invalid games and a throughput summary"""
+    stats = Counter()
+    start = time.perf_counter()
+    for number, game in enumerate(iter_games(stream), start=1):
+        if limit and number > limit:
+            break
+        report = validate_game(game, number)
+        stats['games'] += 1
+        stats['plies'] += report.plies
+        stats['valid' if report.valid else 'invalid'] += 1
+        stats[f"result {report.tags.get('Result', '?')}"] += 1
+        if report.status:
+            stats[report.status] += 1
+        if jsonl:
+            jsonl.write(json.dumps(report.to_dict()) + '\n')
+        if verbose or not report.valid:
+            players = f"{report.tags.get('White', '?')} - {report.tags.get('Black', '?')}"
+            print(f"game {number} ({players}): {report.error or 'ok'} after {report.plies} plies")
+
+    seconds = time.perf_counter() - start
+    print(f"{stats['games']} games ({stats['valid']} valid, {stats['invalid']} invalid), {stats['plies']} moves "
+          f"in {seconds:.2f}s: {stats['games'] / max(seconds, 1e-9):.1f} games/s, "
+          f"{stats['plies'] / max(seconds, 1e-9):.0f} moves/s")
+    for key, count in sorted(stats.items()):
+        if key.startswith('result ') or key in ('checkmate', 'stalemate', 'threefold repetition'):
+            print(f"  {key}: {count}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate PGN game archives against the chess rules engine")
+    parser.add_argument("pgn", help="PGN file to read, '-' for stdin")
+    parser.add_argument("--limit", type=int, help="stop after N games")
+    parser.add_argument("--jsonl", help="write one JSON report per game to this file")
+    parser.add_argument("--verbose", action="store_true", help="print a line for valid games too")
+    args = parser.parse_args()
+
+    stream = sys.stdin if args.pgn == '-' else open(args.pgn, encoding='utf-8', errors='replace')
+    jsonl = open(args.jsonl, 'w') if args.jsonl else None
+    try:
+        stats = validate_file(stream, args.limit, jsonl, args.verbose)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if jsonl:
+            jsonl.close()
+    sys.exit(1 if stats['invalid'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Bounded cache of per-position move generation results, keyed by Zobrist key
+
+from collections import OrderedDict
+from typing import List, Tuple
+
+from bitboard import Move, Position, generate_legal_moves, is_in_check
+
+
+class TranspositionCache(object):
+    """
+    Memoizes the legal moves and check status of the side to move, keyed by Position.key.
+    Holds at most max_entries positions and evicts the least recently used one when full.
+
+    The returned move lists are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, position: Position) -> Tuple[List[Move], bool]:
+        """(legal moves, in check) for the side to move in `position`"""
+        key = position.key
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = (generate_legal_moves(position), is_in_check(position))
+        self.entries[key] = entry
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def legal_moves(self, position: Position) -> List[Move]:
+        return self.lookup(position)[0]
+
+    def in_check(self, position: Position) -> bool:
+        return self.lookup(position)[1]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
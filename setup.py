@@ -1,4 +1,4 @@
-from setuptools import setup, find_packages
+from setuptools import setup, find_namespace_packages
 
 setup(
     name="agents",
@@ -9,19 +9,22 @@ setup(
     author="Eduardo Montilva",
     author_email="eduardojmg.dev@gmail.com",
     url="https://github.com/edumntg/agents",
-    packages=find_packages(),
+    # The game directories have no __init__.py, see utils/launch.py
+    packages=find_namespace_packages(include=["utils", "wordle", "tic_tac_toe"]),
     install_requires=[
         "streamlit",
         "python-dotenv",
         "phidata",
         "requests",
         "rich",
-        "openai"
+        "openai",
+        "httpx",
+        "numpy"
     ],
     entry_points={
         "console_scripts": [
-            "wordle=wordle.wordle:play_with_evaluator",
-            "tictactoe=tic_tac_toe.tic_tac_toe:main"
+            "wordle=utils.launch:wordle",
+            "tictactoe=utils.launch:tictactoe"
         ],
     },
     classifiers=[
@@ -0,0 +1,72 @@
+# Re-prompting LLM players for a legal move
+#
+# Usage (from the repository root):
+#   python -m pytest tic_tac_toe
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from tic_tac_toe import ask_move, stand_in_move
+from tic_tac_toe_arena import play_match
+from tic_tac_toe_board import Board
+from tic_tac_toe_solver import PerfectPlayer
+from utils.prompts import PromptBuilder
+
+# Off the board, no move at all, and a cell taken below
+ILLEGAL = ["3, 3", "I pass", "1, 1"]
+
+
+class ScriptedPlayer(object):
+    """Replies with `replies` in turn, then plays random free cells"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def _reply(self, prompt):
+        self.calls += 1
+        return self.replies.pop(0) if self.replies else stand_in_move(prompt)
+
+    def run(self, message, stream=False, **kwargs):
+        content = self._reply(message)
+        return iter([SimpleNamespace(content=content)]) if stream else SimpleNamespace(content=content)
+
+    async def arun(self, message, **kwargs):
+        return SimpleNamespace(content=self._reply(message))
+
+
+def board():
+    position = Board()
+    position.play(1, 1, 'O')
+    return position
+
+
+def test_legal_move_on_the_last_try_is_played():
+    player = ScriptedPlayer(ILLEGAL + ["0, 0"])
+    assert ask_move(player, board(), 'X', PromptBuilder(80), max_invalid=3) == (0, 0)
+    assert player.calls == 4
+
+
+def test_no_legal_move_in_any_try_raises():
+    player = ScriptedPlayer(ILLEGAL + ["1, 1"])
+    with pytest.raises(ValueError, match="4 tries"):
+        ask_move(player, board(), 'X', PromptBuilder(80), max_invalid=3)
+
+
+def test_forced_move_needs_no_call():
+    position = Board.from_rows([['X', 'O', 'X'], ['X', 'O', 'O'], ['O', 'X', None]])
+    player = ScriptedPlayer([])
+    assert ask_move(player, position, 'X', PromptBuilder(80)) == (2, 2)
+    assert player.calls == 0
+
+
+def test_match_accepts_legal_move_on_the_last_try():
+    async def call(agent, prompt):
+        return await agent.arun(prompt)
+
+    # X opens with three replies without a legal move, then a legal one
+    player = ScriptedPlayer(["3, 3", "I pass", "9, 9", "0, 0"])
+    status, moves = asyncio.run(play_match(player, PerfectPlayer('O'), call, max_invalid=3))
+    assert moves >= 5
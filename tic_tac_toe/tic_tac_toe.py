@@ -1,15 +1,18 @@
-from dotenv import load_dotenv
+import argparse
+import random
+import re
 
-load_dotenv()
-
-from phi.model.deepseek import DeepSeekChat
-from phi.agent import Agent
+from utils import agents, backends, llm_cache
+from utils.prompts import PromptBuilder
+from tic_tac_toe_board import DRAW, FULL, KEEP_PLAYING, RESULTS, SIZE, Board, cell_bit
+from tic_tac_toe_solver import PerfectPlayer
 
+# The agents are built on first use, see utils/agents.py
 # Player X
-player_x = Agent(
+player_x = agents.register(
+    "tic-tac-toe-x",
     name="Player X",
     # model=Gemini(id="gemini-2.0-flash-exp", api_key=st.session_state.google_api_key),
-    model = DeepSeekChat(),
     instructions=[
         "You are a Tic-Tac-Toe player using the symbol 'X'.",
         "Your opponent is using the symbol 'O'. Block their potential winning moves.",
@@ -22,9 +25,9 @@ player_x = Agent(
 )
 
 # Player X
-player_o = Agent(
+player_o = agents.register(
+    "tic-tac-toe-o",
     name="Player O",
-    model=DeepSeekChat(),
     instructions=[
         "You are a Tic-Tac-Toe player using the symbol 'O'.",
         "Your opponent is using the symbol 'X'. Block their potential winning moves.",
@@ -36,9 +39,9 @@ player_o = Agent(
     markdown=True,
 )
 
-judge = Agent(
+judge = agents.register(
+    "tic-tac-toe-judge",
     name="Judge",
-    model=DeepSeekChat(),
     instructions=[
         "You are the judge of a Tic-Tac-Toe game.",
         "The board is presented as rows with positions separated by '|'.",
@@ -72,59 +75,190 @@ def pretty_board(board):
     return result
 
 
+def board_prompt(board, symbol, prompts: PromptBuilder, note=None):
+    """Compact prompt for the player using `symbol`: one line per row ('.' for empty) and the free cells"""
+    rows = '/'.join(''.join(cell or '.' for cell in row) for row in board)
+    free = ' '.join(f"{i},{j}" for i, row in enumerate(board) for j, cell in enumerate(row) if cell is None)
+    prompts.add(f"Board rows 0-2 top to bottom, '.' is empty: {rows}")
+    prompts.add(f"You play {symbol}. Reply only with your move as 'row, col'")
+    prompts.add(note, priority=2)
+    prompts.add(f"Free cells: {free}", priority=1)
+    return prompts.build()
 
-if __name__ == "__main__":
-    # Initialize board
-    board = [
-        [None, None, None],
-        [None, None, None],
-        [None, None, None],
-    ]
 
-    turn = player_x # Player X always starts
+def stand_in_move(prompt):
+    """Reply of the scripted stand-in player: a random free cell of the board in the prompt, then some chatter"""
+    rows = re.search(r"empty: ([XO./]+)", prompt).group(1).split('/')
+    row, col = random.choice([(i, j) for i, row in enumerate(rows) for j, cell in enumerate(row) if cell == '.'])
+    return f"{row}, {col}\n\nTaking ({row}, {col}) keeps the most lines open for me and blocks the opponent."
 
-    status = 'Keep Playing'
-    while status == 'Keep Playing':
-        # Make a move
-        response = turn.run(f"""
-        # Current board status
-        ```python {board}```
-        
-        Make your move in the format: 'row, col'
-        """)
 
-        print(response.content)
+# 'row, col', complete once something other than a digit follows it
+_MOVE = re.compile(r"(\d+)\s*,\s*(\d+)(?=\D)")
 
-        # Get move
-        while True:
-            content = response.content if hasattr(response, 'content') else str(response)
-            row, col = (int(value) for value in content.split(','))
-            if board[row][col] is None:
-                board[row][col] = 'X' if turn == player_x else 'O'
-                break
-            else:
-                response = turn.run(f"""
-                # Current board status
-                ```python {board}```
-                
-                Your previous move was invalid. Please analyze the board and make a valid move in the format: 'row, col'
-                """)
 
-        # Print board
-        print(pretty_board(board))
+class MoveStream(object):
+    """
+    Finds the first legal 'row, col' in a reply that arrives in chunks. Moves are checked against
+    `free`, the mask of empty cells, as soon as they appear: taken or off-board cells are skipped
+    (and kept in .illegal), so a reply like "0, 0 is taken, I play 1, 1" still gives a move.
+    """
+
+    def __init__(self, free: int = FULL):
+        self.free = free
+        self.text = ''
+        self.pos = 0
+        self.illegal = []
+
+    def feed(self, chunk: str):
+        """The move completed by `chunk`, None while there is none"""
+        self.text += chunk
+        for match in _MOVE.finditer(self.text, self.pos):
+            self.pos = match.end()
+            move = int(match.group(1)), int(match.group(2))
+            if move[0] < SIZE and move[1] < SIZE and self.free & cell_bit(*move):
+                return move
+            self.illegal.append(move)
+        return None
+
+    def finish(self):
+        """The move at the very end of the reply, if any"""
+        return self.feed(' ')
+
+
+def read_move(agent, prompt, board):
+    """
+    Stream the agent's reply and stop at its first legal move: the rest of the generation is
+    cancelled by closing the stream. Returns the move (None if there is none) and the illegal
+    moves met on the way.
+    """
+    moves = MoveStream(board.free)
+    chunks = agent.run(prompt, stream=True)
+    try:
+        for chunk in chunks:
+            move = moves.feed(getattr(chunk, 'content', chunk) or '')
+            if move:
+                return move, moves.illegal
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+    return moves.finish(), moves.illegal
+
+
+def invalid_note(illegal):
+    """Re-prompt note naming the cells the player tried"""
+    if not illegal:
+        return "Your previous reply had no move, answer with 'row, col'"
+    tried = ', '.join(f"{row},{col}" for row, col in illegal)
+    return f"Your previous move ({tried}) is not a free cell, pick one of the free cells"
+
 
-        # Ask judge
-        judge_response = judge.run(f"""
+def ask_move(player, board, symbol, prompts: PromptBuilder, max_invalid: int = 3):
+    """
+    The move of an LLM player: its first legal move, asking again with a note up to `max_invalid`
+    times when a reply has none. A forced move is played without asking.
+    """
+    move = only_move(board)
+    note = None
+    tries = 0
+    while move is None and tries <= max_invalid:
+        move, illegal = read_move(player, board_prompt(board.rows(), symbol, prompts, note), board)
+        print(f"Prompt: {prompts.last_size} tokens")
+        note = invalid_note(illegal)
+        tries += 1
+    if move is None:
+        raise ValueError(f"Player {symbol} made no legal move in {tries} tries")
+    return move
+
+
+def only_move(board):
+    """The last free cell when only one is left, so it needs no agent call"""
+    free = board.free
+    if free & (free - 1):
+        return None
+    index = free.bit_length() - 1
+    return divmod(index, SIZE)
+
+
+def normalize_result(text):
+    """Map a free-form judge answer onto one of the local results"""
+    text = text.lower()
+    if 'x wins' in text:
+        return RESULTS[0]
+    if 'o wins' in text:
+        return RESULTS[1]
+    if 'draw' in text:
+        return DRAW
+    return KEEP_PLAYING
+
+
+def ask_judge(board, agent=judge):
+    judge_response = agent.run(f"""
         # Current board status
         {pretty_board(board)}
         
         Determine is there is a winner and announce the result. If not winner, return 'Keep Playing'. If draw, return 'Draw'
         """)
-        status = judge_response.content if hasattr(judge_response, 'content') else str(judge_response)
-        print("JUDGE RESPONSE", judge_response.content)
+    return judge_response.content if hasattr(judge_response, 'content') else str(judge_response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two agents play tic-tac-toe")
+    parser.add_argument("--judge", choices=["local", "cross-check"], default="local",
+                        help="judge positions locally, or also ask the LLM judge and log where it disagrees")
+    parser.add_argument("--x", choices=["llm", "perfect"], default="llm", help="the agent or the solved-table player for X")
+    parser.add_argument("--o", choices=["llm", "perfect"], default="llm", help="the agent or the solved-table player for O")
+    parser.add_argument("--max-invalid", type=int, default=3, help="re-prompts allowed for a move that is not legal")
+    backends.add_arguments(parser)
+    llm_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    backends.seed(args)
+    cache = llm_cache.from_args(args)
+    x = PerfectPlayer('X') if args.x == 'perfect' else llm_cache.cached(backends.backend(player_x, args, stand_in_move), cache)
+    o = PerfectPlayer('O') if args.o == 'perfect' else llm_cache.cached(backends.backend(player_o, args, stand_in_move), cache)
+    # The stand-in judge never sees a finished game
+    referee = llm_cache.cached(backends.backend(judge, args, lambda prompt: KEEP_PLAYING), cache)
+
+    board = Board()
+    turn = x # Player X always starts
+    prompts = PromptBuilder(budget=80)
+    moves = disagreements = 0
+
+    status = KEEP_PLAYING
+    while status == KEEP_PLAYING:
+        # Make a move
+        symbol = 'X' if turn == x else 'O'
+        if hasattr(turn, 'next_move'):
+            # Local player, no prompt needed
+            move = turn.next_move(board)
+        else:
+            move = ask_move(turn, board, symbol, prompts, args.max_invalid)
+        print("{}, {}".format(*move))
+        board.play(*move, symbol)
+        moves += 1
+
+        # Print board
+        print(pretty_board(board.rows()))
+
+        # Judge
+        status = board.status()
+        if args.judge == 'cross-check':
+            judge_answer = ask_judge(board.rows(), referee)
+            if normalize_result(judge_answer) != status:
+                disagreements += 1
+                print(f"JUDGE DISAGREEMENT after move {moves}: local {status!r}, LLM judge {judge_answer!r}")
         # Switch turns
-        turn = player_o if turn == player_x else player_x
+        turn = o if turn == x else x
 
     print(f"GAME OVER! Result {status}")
+    if args.judge == 'cross-check':
+        print(f"LLM judge disagreed on {disagreements} of {moves} positions")
+    print(prompts.report())
+    if cache is not None:
+        print(cache.report())
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Tic-tac-toe tournaments: many games played at once on an asyncio event loop
+#
+# Each game gets its own copy of the agents (utils.arena.fork) and makes its agent calls through
+# one shared AgentCaller, which bounds how many are in flight and backs off on rate limits.
+# Players are the DeepSeek agents of tic_tac_toe.py (on any utils/backends.py backend), the
+# perfect player or a stand-in model that plays random free cells after a simulated latency and
+# can be rate limited (--capacity). --scaling replays the tournament at several
+# concurrency limits to show the throughput of each. With --cache, repeated agent requests are
+# answered from the LLM response cache (utils/llm_cache.py).
+#
+# Usage (from the repository root, with it on PYTHONPATH):
+#   python tic_tac_toe/tic_tac_toe_arena.py --games 50 --concurrency 10 [--x llm] [--o perfect]
+#   python tic_tac_toe/tic_tac_toe_arena.py --games 200 --x stand-in --o stand-in --scaling 1,4,16,64
+
+import argparse
+import asyncio
+import time
+
+from utils import backends, llm_cache
+from utils.arena import AgentCaller, StandInModel, fork, report, run_matches
+from utils.prompts import PromptBuilder
+from tic_tac_toe import MoveStream, board_prompt, invalid_note, only_move, player_o, player_x, stand_in_move
+from tic_tac_toe_board import KEEP_PLAYING, Board
+from tic_tac_toe_solver import PerfectPlayer
+
+
+async def play_match(x, o, call, max_invalid: int = 3):
+    """
+    One game between `x` and `o`: LLM agents awaited through `call(agent, prompt)`, or local
+    players with next_move(board). Returns the result and the number of moves.
+    """
+    board = Board()
+    prompts = PromptBuilder(budget=80)
+    players = {'X': x, 'O': o}
+    symbol = 'X'
+    moves = 0
+    while board.status() == KEEP_PLAYING:
+        player = players[symbol]
+        if hasattr(player, 'next_move'):
+            move = player.next_move(board)
+        else:
+            move = only_move(board)
+            note = None
+            tries = 0
+            while move is None and tries <= max_invalid:
+                response = await call(player, board_prompt(board.rows(), symbol, prompts, note))
+                reply = MoveStream(board.free)
+                move = reply.feed(response.content or '') or reply.finish()
+                note = invalid_note(reply.illegal)
+                tries += 1
+            if move is None:
+                raise ValueError(f"Player {symbol} made no legal move in {tries} tries")
+        board.play(*move, symbol)
+        moves += 1
+        symbol = 'O' if symbol == 'X' else 'X'
+    return board.status(), moves
+
+
+def create_player(kind: str, symbol: str, args, cache=None):
+    if kind == 'perfect':
+        return PerfectPlayer(symbol)
+    if kind == 'stand-in':
+        latency = args.latency_ms / 1e3
+        model = StandInModel(stand_in_move, latency, latency / 3, args.capacity, token_delay=args.token_ms / 1e3)
+        return llm_cache.cached(model, cache)
+    agent = backends.backend(player_x if symbol == 'X' else player_o, args, stand_in_move)
+    return llm_cache.cached(agent, cache)
+
+
+def tournament(args, concurrency: int):
+    backends.seed(args)
+    cache = llm_cache.from_args(args)
+    x = create_player(args.x, 'X', args, cache)
+    o = create_player(args.o, 'O', args, cache)
+
+    async def run():
+        caller = AgentCaller(concurrency)
+        start = time.perf_counter()
+        results = await run_matches(lambda game: play_match(fork(x), fork(o), caller), args.games, args.timeout)
+        report(results, time.perf_counter() - start, caller)
+        if cache is not None:
+            print(cache.report())
+        if 'llm' in (args.x, args.o) and args.backend in ('live', 'record'):
+            from utils import http_pool
+            print(http_pool.report())
+
+    asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many tic-tac-toe games concurrently")
+    players = ["llm", "perfect", "stand-in"]
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8, help="max agent calls in flight")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per game")
+    parser.add_argument("--x", choices=players, default="llm")
+    parser.add_argument("--o", choices=players, default="llm")
+    parser.add_argument("--capacity", type=int, help="stand-in rate limit: max requests in flight")
+    parser.add_argument("--scaling", help="comma separated concurrency limits to compare, e.g. 1,4,16")
+    backends.add_arguments(parser)
+    llm_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    for concurrency in ([int(value) for value in args.scaling.split(',')] if args.scaling else [args.concurrency]):
+        tournament(args, concurrency)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Tic-tac-toe board as two 9-bit masks
+#
+# Cell (row, col) is bit row * 3 + col of the mask of the player who took it. WINS is a 512 entry
+# table telling whether a mask contains a full line, so judging a position is two table lookups.
+
+from typing import List, Optional
+
+SIZE = 3
+CELLS = SIZE * SIZE
+FULL = (1 << CELLS) - 1
+SYMBOLS = ('X', 'O')
+
+KEEP_PLAYING = 'Keep Playing'
+DRAW = 'Draw'
+RESULTS = ('Player X wins', 'Player O wins', DRAW, KEEP_PLAYING)
+
+WIN_LINES = (
+    [sum(1 << (row * SIZE + col) for col in range(SIZE)) for row in range(SIZE)]
+    + [sum(1 << (row * SIZE + col) for row in range(SIZE)) for col in range(SIZE)]
+    + [sum(1 << (i * SIZE + i) for i in range(SIZE)), sum(1 << (i * SIZE + SIZE - 1 - i) for i in range(SIZE))]
+)
+WINS = [any(mask & line == line for line in WIN_LINES) for mask in range(1 << CELLS)]
+
+
+def cell_bit(row: int, col: int) -> int:
+    return 1 << (row * SIZE + col)
+
+
+def status(x: int, o: int) -> str:
+    """Result of the position: one of RESULTS"""
+    if WINS[x]:
+        return 'Player X wins'
+    if WINS[o]:
+        return 'Player O wins'
+    if x | o == FULL:
+        return DRAW
+    return KEEP_PLAYING
+
+
+class Board(object):
+    """Masks of the cells taken by X and by O"""
+
+    def __init__(self, x: int = 0, o: int = 0):
+        self.x = x
+        self.o = o
+
+    @classmethod
+    def from_rows(cls, rows: List[List[Optional[str]]]) -> 'Board':
+        board = cls()
+        for row, cells in enumerate(rows):
+            for col, cell in enumerate(cells):
+                if cell:
+                    board.play(row, col, cell)
+        return board
+
+    def rows(self) -> List[List[Optional[str]]]:
+        """The board as the list of rows used in prompts, None for empty cells"""
+        return [
+            ['X' if self.x & cell_bit(row, col) else 'O' if self.o & cell_bit(row, col) else None for col in range(SIZE)]
+            for row in range(SIZE)
+        ]
+
+    @property
+    def free(self) -> int:
+        return FULL & ~(self.x | self.o)
+
+    def is_free(self, row: int, col: int) -> bool:
+        return 0 <= row < SIZE and 0 <= col < SIZE and bool(self.free & cell_bit(row, col))
+
+    def play(self, row: int, col: int, symbol: str):
+        if not self.is_free(row, col):
+            raise ValueError(f"Cell ({row}, {col}) is not free")
+        if symbol == 'X':
+            self.x |= cell_bit(row, col)
+        else:
+            self.o |= cell_bit(row, col)
+
+    def status(self) -> str:
+        return status(self.x, self.o)
@@ -0,0 +1,342 @@
+# Perfect play for tic-tac-toe and an alpha-beta engine for m,n,k-games
+#
+# The 3x3 game is solved once: the minimax value of every reachable position is stored in a
+# 2^18 byte table indexed by x_mask | o_mask << 9 and cached on disk, so PerfectPlayer answers
+# with two table lookups per free cell.
+#
+# MNKEngine plays k-in-a-row on any rows x cols board with negamax alpha-beta, iterative
+# deepening under a time budget and a transposition table. Positions that are mirror images or
+# rotations of each other share one table entry: the engine keeps every symmetric image of the
+# masks up to date as stones are placed and uses the smallest one as the key.
+#
+# Usage:
+#   python tic_tac_toe/tic_tac_toe_solver.py table                     # build or load the 3x3 table
+#   python tic_tac_toe/tic_tac_toe_solver.py selfplay --rows 4 --cols 4 --k 3 --time-ms 1000
+
+import argparse
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from tic_tac_toe_board import CELLS, FULL, SIZE, WINS, Board
+
+CACHE_DIR = os.environ.get(
+    'TIC_TAC_TOE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'agents', 'tic_tac_toe')
+)
+TABLE_FILE = os.path.join(CACHE_DIR, 'solved-3x3.bin')
+
+# Table values are from the point of view of the side to move: 10 - stones for a win with
+# `stones` stones on the board, its negation for a loss, 0 for a draw. The engine uses the same
+# scheme with WIN instead of 10, far above any heuristic score.
+WIN = 10_000_000
+INFINITY = 1_000_000_000
+UNREACHABLE = 0
+
+_table: bytes = None
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+def _solve(x: int, o: int, table: bytearray) -> int:
+    key = x | o << CELLS
+    if table[key] != UNREACHABLE:
+        return table[key] - 128
+    stones = popcount(x | o)
+    if WINS[x] or WINS[o]:
+        score = -(10 - stones)
+    elif x | o == FULL:
+        score = 0
+    else:
+        x_to_move = stones % 2 == 0
+        score = -INFINITY
+        free = FULL & ~(x | o)
+        while free:
+            bit = free & -free
+            free ^= bit
+            child = _solve(x | bit, o, table) if x_to_move else _solve(x, o | bit, table)
+            score = max(score, -child)
+    table[key] = score + 128
+    return score
+
+
+def build_table() -> bytes:
+    """Minimax value + 128 of every position reachable from the empty board, 0 for the others"""
+    table = bytearray(1 << (2 * CELLS))
+    _solve(0, 0, table)
+    return bytes(table)
+
+
+def load_table(path: str = TABLE_FILE) -> bytes:
+    """The solved 3x3 table, read once per process and built first when it is not cached yet"""
+    global _table
+    if _table is None:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(build_table())
+            os.replace(temporary, path)
+        with open(path, 'rb') as f:
+            _table = f.read()
+    return _table
+
+
+def position_value(x: int, o: int) -> Optional[int]:
+    """Minimax value for the side to move, None for positions that cannot be reached"""
+    value = load_table()[x | o << CELLS]
+    return None if value == UNREACHABLE else value - 128
+
+
+class PerfectPlayer(object):
+    """
+    Plays 3x3 tic-tac-toe perfectly from the solved table, winning as fast and losing as late as
+    possible. Used in place of an LLM agent: the game asks it for next_move(board) directly.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.table = load_table()
+
+    def next_move(self, board: Board) -> Tuple[int, int]:
+        best, best_score = None, -INFINITY
+        for cell in range(CELLS):
+            bit = 1 << cell
+            if not board.free & bit:
+                continue
+            x, o = (board.x | bit, board.o) if self.symbol == 'X' else (board.x, board.o | bit)
+            score = -(self.table[x | o << CELLS] - 128)
+            if score > best_score:
+                best, best_score = cell, score
+        return divmod(best, SIZE)
+
+
+class MNKResult(NamedTuple):
+    move: Optional[Tuple[int, int]]
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+    exact: bool
+
+    def describe(self) -> str:
+        if abs(self.score) > WIN // 2:
+            score = f"{'win' if self.score > 0 else 'loss'} after {WIN - abs(self.score)} stones"
+        elif self.exact:
+            score = "draw"
+        else:
+            score = f"{self.score:+d}"
+        return f"depth {self.depth}  {score}  nodes {self.nodes}  time {self.seconds:.2f}s"
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class MNKEngine(object):
+    """Negamax alpha-beta for k-in-a-row on a rows x cols board. Cell (r, c) is bit r * cols + c"""
+
+    def __init__(self, rows: int = 3, cols: int = 3, k: int = 3, max_entries: int = 2_000_000):
+        self.rows, self.cols, self.k = rows, cols, k
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+        self.max_entries = max_entries
+        self.tt: Dict[int, tuple] = {}
+
+        self.lines = []
+        for r in range(rows):
+            for c in range(cols):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_r, end_c = r + dr * (k - 1), c + dc * (k - 1)
+                    if 0 <= end_r < rows and 0 <= end_c < cols:
+                        self.lines.append(sum(1 << ((r + dr * i) * cols + c + dc * i) for i in range(k)))
+        self.lines_through = [[line for line in self.lines if line >> cell & 1] for cell in range(self.cells)]
+
+        # Cell permutations of the board symmetries (8 for square boards, 4 otherwise)
+        transforms = [lambda r, c: (r, c), lambda r, c: (rows - 1 - r, c),
+                      lambda r, c: (r, cols - 1 - c), lambda r, c: (rows - 1 - r, cols - 1 - c)]
+        if rows == cols:
+            transforms += [lambda r, c: (c, r), lambda r, c: (cols - 1 - c, r),
+                           lambda r, c: (c, rows - 1 - r), lambda r, c: (cols - 1 - c, rows - 1 - r)]
+        self.symmetries = []
+        for transform in transforms:
+            permutation = []
+            for cell in range(self.cells):
+                r, c = transform(*divmod(cell, cols))
+                permutation.append(r * cols + c)
+            self.symmetries.append(permutation)
+        self.inverses = [[permutation.index(cell) for cell in range(self.cells)] for permutation in self.symmetries]
+
+        # Try central cells first
+        middle_r, middle_c = (rows - 1) / 2, (cols - 1) / 2
+        self.order = sorted(range(self.cells), key=lambda cell: abs(cell // cols - middle_r) + abs(cell % cols - middle_c))
+        self.nodes = 0
+        self.horizon = False
+        self._deadline = None
+
+    def _images(self, mask: int) -> List[int]:
+        return [sum(1 << permutation[cell] for cell in range(self.cells) if mask >> cell & 1)
+                for permutation in self.symmetries]
+
+    def evaluate(self, us: int, them: int) -> int:
+        """Open lines weighted by how many stones they hold, from the point of view of `us`"""
+        score = 0
+        for line in self.lines:
+            mine, theirs = line & us, line & them
+            if mine and not theirs:
+                score += 1 << (2 * popcount(mine))
+            elif theirs and not mine:
+                score -= 1 << (2 * popcount(theirs))
+        return score
+
+    def search(self, x: int, o: int, time_ms: int = 1000, max_depth: int = None) -> MNKResult:
+        """Best move for the side to move (X when both have as many stones) within time_ms"""
+        start = time.perf_counter()
+        self.nodes = 0
+        self._deadline = None
+        if len(self.tt) > self.max_entries:
+            self.tt.clear()
+        us, them = (x, o) if popcount(x) == popcount(o) else (o, x)
+        empty = popcount(self.full & ~(x | o))
+        result = MNKResult(None, 0, 0, 0, 0.0, False)
+        for depth in range(1, min(max_depth or empty, empty) + 1):
+            self.horizon = False
+            try:
+                score, move = self._root(us, them, depth)
+            except SearchTimeout:
+                break
+            # A win found before the search is exact may not be the fastest one, so keep deepening
+            exact = not self.horizon
+            result = MNKResult(divmod(move, self.cols), score, depth, self.nodes, time.perf_counter() - start, exact)
+            # The first iteration runs without a deadline so there is always a move to play
+            self._deadline = start + time_ms / 1000
+            if exact or time.perf_counter() >= self._deadline:
+                break
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - start)
+
+    def _root(self, us: int, them: int, depth: int) -> Tuple[int, int]:
+        alpha, best = -INFINITY, None
+        us_images, them_images = self._images(us), self._images(them)
+        stones = popcount(us | them) + 1
+        for cell in self.order:
+            bit = 1 << cell
+            if (us | them) & bit:
+                continue
+            mine = us | bit
+            if any(line & mine == line for line in self.lines_through[cell]):
+                score = WIN - stones
+            else:
+                images = [image | 1 << permutation[cell] for image, permutation in zip(us_images, self.symmetries)]
+                score = -self.negamax(them, mine, them_images, images, depth - 1, -INFINITY, -alpha, stones)
+            if score > alpha or best is None:
+                alpha, best = max(alpha, score), cell
+        return alpha, best
+
+    def negamax(self, us: int, them: int, us_images: List[int], them_images: List[int], depth: int, alpha: int,
+                beta: int, stones: int) -> int:
+        """Score for `us` to move after `stones` stones, with us_images/them_images the masks under every symmetry"""
+        self.nodes += 1
+        if self._deadline and self.nodes & 1023 == 0 and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        if stones == self.cells:
+            return 0
+        if depth == 0:
+            self.horizon = True
+            return self.evaluate(us, them)
+
+        keys = [mine | theirs << self.cells for mine, theirs in zip(us_images, them_images)]
+        key = min(keys)
+        symmetry = keys.index(key)
+        entry = self.tt.get(key)
+        hash_move = None
+        if entry is not None:
+            entry_depth, entry_score, flag, entry_move = entry
+            if entry_depth >= depth:
+                if flag == 0 or (flag > 0 and entry_score >= beta) or (flag < 0 and entry_score <= alpha):
+                    self.horizon = self.horizon or entry_depth < self.cells
+                    return entry_score
+            hash_move = self.inverses[symmetry][entry_move]
+
+        # Track whether this subtree reaches the horizon; exact results are reused at any depth
+        outer_horizon, self.horizon = self.horizon, False
+        original_alpha = alpha
+        best, best_move = -INFINITY, None
+        occupied = us | them
+        moves = self.order if hash_move is None else [hash_move] + [cell for cell in self.order if cell != hash_move]
+        for cell in moves:
+            bit = 1 << cell
+            if occupied & bit:
+                continue
+            mine = us | bit
+            if any(line & mine == line for line in self.lines_through[cell]):
+                score = WIN - stones - 1
+            else:
+                images = [image | 1 << permutation[cell] for image, permutation in zip(us_images, self.symmetries)]
+                score = -self.negamax(them, mine, them_images, images, depth - 1, -beta, -alpha, stones + 1)
+            if score > best:
+                best, best_move = score, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        flag = 1 if best >= beta else -1 if best <= original_alpha else 0
+        self.tt[key] = (depth if self.horizon else self.cells, best, flag, self.symmetries[symmetry][best_move])
+        self.horizon = outer_horizon or self.horizon
+        return best
+
+
+def selfplay(rows: int, cols: int, k: int, time_ms: int):
+    engine = MNKEngine(rows, cols, k)
+    x = o = 0
+    for turn in range(rows * cols):
+        symbol = 'X' if turn % 2 == 0 else 'O'
+        result = engine.search(x, o, time_ms)
+        row, col = result.move
+        bit = 1 << (row * cols + col)
+        if symbol == 'X':
+            x |= bit
+        else:
+            o |= bit
+        print(f"{symbol} plays {row},{col}  {result.describe()}")
+        for r in range(rows):
+            print(' '.join('X' if x >> (r * cols + c) & 1 else 'O' if o >> (r * cols + c) & 1 else '.' for c in range(cols)))
+        mine = x if symbol == 'X' else o
+        if any(line & mine == line for line in engine.lines):
+            print(f"Player {symbol} wins")
+            return
+    print("Draw")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solved tic-tac-toe table and m,n,k alpha-beta engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    table_parser = commands.add_parser("table", help="build or load the solved 3x3 table")
+    table_parser.add_argument("--rebuild", action="store_true", help="discard the cached table first")
+
+    selfplay_parser = commands.add_parser("selfplay", help="let the engine play both sides of an m,n,k-game")
+    selfplay_parser.add_argument("--rows", type=int, default=3)
+    selfplay_parser.add_argument("--cols", type=int, default=3)
+    selfplay_parser.add_argument("--k", type=int, default=3)
+    selfplay_parser.add_argument("--time-ms", type=int, default=1000, help="time budget per move")
+
+    args = parser.parse_args()
+
+    if args.command == "selfplay":
+        selfplay(args.rows, args.cols, args.k, args.time_ms)
+        return
+
+    if args.rebuild and os.path.exists(TABLE_FILE):
+        os.remove(TABLE_FILE)
+    cached = os.path.exists(TABLE_FILE)
+    start = time.perf_counter()
+    table = load_table()
+    seconds = time.perf_counter() - start
+    reachable = sum(1 for value in table if value != UNREACHABLE)
+    print(f"{'Loaded' if cached else 'Built'} {reachable} positions in {seconds * 1000:.1f} ms "
+          f"(value of the empty board: {position_value(0, 0)}) from {TABLE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
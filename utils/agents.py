@@ -0,0 +1,62 @@
+# Registry of the LLM agents, built on first use
+#
+# Importing phidata and the openai client takes most of a second, and building the agents needs
+# the API settings from .env. Games register their agents here instead of building them at import
+# time and get a LazyAgent back, so --help and the local-only modes never pay for either.
+
+from typing import Dict
+
+_specs: Dict[str, dict] = {}
+_agents = {}
+
+
+def build(model: str = "deepseek-chat", **options):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from phi.agent import Agent
+    from utils.http_pool import pooled_model
+    # All agents of the process share the HTTP connections to the provider
+    return Agent(model=pooled_model(model), **options)
+
+
+def get(key: str):
+    """The phi Agent registered as `key`, built the first time it is asked for"""
+    if key not in _agents:
+        if key not in _specs:
+            raise KeyError(f"No agent registered as {key!r}, registered: {', '.join(sorted(_specs)) or 'none'}")
+        _agents[key] = build(**_specs[key])
+    return _agents[key]
+
+
+class LazyAgent(object):
+    """
+    Handle of a registered agent. It knows the agent's instructions and model without building
+    it; run(), arun() and deep_copy() build it on first use.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.instructions = _specs[key].get('instructions')
+        # Same as llm_cache.model_name() of the built agent
+        self.model_name = f"DeepSeekChat:{_specs[key]['model']}"
+
+    @property
+    def agent(self):
+        return get(self.key)
+
+    def run(self, message, **kwargs):
+        return self.agent.run(message, **kwargs)
+
+    async def arun(self, message, **kwargs):
+        return await self.agent.arun(message, **kwargs)
+
+    def deep_copy(self):
+        return self.agent.deep_copy()
+
+
+def register(key: str, model: str = "deepseek-chat", **options) -> LazyAgent:
+    """Declare the agent `key`, a DeepSeek `model` with the other keyword arguments of phi's Agent"""
+    _specs[key] = dict(options, model=model)
+    _agents.pop(key, None)
+    return LazyAgent(key)
@@ -0,0 +1,160 @@
+# Plays many independent agent games at once on one asyncio event loop
+#
+# Each game is a coroutine that makes its agent calls through an AgentCaller: at most
+# `concurrency` calls are in flight, and calls refused with a rate limit (HTTP 429) are retried
+# with exponential backoff and jitter. Every game runs under its own timeout, and the results of
+# all games are collected into MatchResult records. StandInModel answers like an LLM agent after
+# a simulated latency, so throughput can be measured offline.
+
+import asyncio
+import random
+import re
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+
+class RateLimited(Exception):
+    """Raised by StandInModel when more calls than its capacity are in flight"""
+    status_code = 429
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    # openai.RateLimitError (used by the phi DeepSeek/OpenAI models) carries status_code 429
+    return getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError'
+
+
+def fork(agent):
+    """
+    A copy of `agent` for one game. phi Agents keep the conversation in memory, so games played
+    at the same time must not share one. Local players are returned as they are.
+    """
+    return agent.deep_copy() if hasattr(agent, 'deep_copy') else agent
+
+
+class StandInModel(object):
+    """
+    Local stand-in for an LLM agent: run()/arun() return an object with .content, produced by
+    `respond(prompt)` after `latency` seconds (+- `jitter`) to the first token and `token_delay`
+    per word after it. run(stream=True) yields the words as they are produced. With `capacity`
+    set, calls made while `capacity` others are in flight fail with RateLimited, like a
+    provider's concurrency limit.
+    """
+
+    def __init__(self, respond: Callable[[str], str], latency: float = 0.2, jitter: float = 0.0,
+                 capacity: Optional[int] = None, seed: Optional[int] = None, token_delay: float = 0.0):
+        self.respond = respond
+        self.latency = latency
+        self.jitter = jitter
+        self.capacity = capacity
+        self.token_delay = token_delay
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.calls = 0
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def _stream(self, content: str):
+        time.sleep(self._delay())
+        for word in re.findall(r"\s*\S+\s*", content):
+            yield SimpleNamespace(content=word)
+            time.sleep(self.token_delay)
+
+    def run(self, message: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        content = self.respond(message)
+        if stream:
+            return self._stream(content)
+        time.sleep(self._delay() + self.token_delay * len(content.split()))
+        return SimpleNamespace(content=content)
+
+    async def arun(self, message: str, **kwargs):
+        self.calls += 1
+        if self.capacity is not None and self.in_flight >= self.capacity:
+            raise RateLimited(f"{self.in_flight} requests in flight, capacity {self.capacity}")
+        self.in_flight += 1
+        try:
+            content = self.respond(message)
+            await asyncio.sleep(self._delay() + self.token_delay * len(content.split()))
+            return SimpleNamespace(content=content)
+        finally:
+            self.in_flight -= 1
+
+
+class AgentCaller(object):
+    """
+    Makes the agent calls of all running games: limits how many are in flight at once and
+    retries rate-limited calls after base_delay * 2^attempt seconds (capped, with jitter).
+    """
+
+    def __init__(self, concurrency: int = 8, retries: int = 6, base_delay: float = 0.5, max_delay: float = 16.0):
+        self.concurrency = concurrency
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.calls = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+
+    async def __call__(self, agent, prompt: str):
+        for attempt in range(self.retries + 1):
+            async with self.semaphore:
+                try:
+                    self.calls += 1
+                    return await agent.arun(prompt)
+                except Exception as e:
+                    if not is_rate_limit(e) or attempt == self.retries:
+                        raise
+                    self.rate_limited += 1
+            # Back off outside the semaphore so other games can use the slot
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+
+class MatchResult(NamedTuple):
+    game: int
+    result: Optional[str]
+    moves: int
+    seconds: float
+    error: Optional[str]
+
+
+async def _run_one(game: int, play: Callable[[int], Awaitable], timeout: Optional[float]) -> MatchResult:
+    start = time.perf_counter()
+    try:
+        result, moves = await asyncio.wait_for(play(game), timeout)
+        error = None
+    except asyncio.TimeoutError:
+        result, moves, error = None, 0, f"timed out after {timeout}s"
+    except Exception as e:
+        result, moves, error = None, 0, f"{type(e).__name__}: {e}"
+    return MatchResult(game, result, moves, time.perf_counter() - start, error)
+
+
+async def run_matches(play: Callable[[int], Awaitable], games: int, timeout: Optional[float] = None) -> List[MatchResult]:
+    """
+    Run play(0) ... play(games - 1) concurrently, each under `timeout` seconds. `play` returns
+    (result, moves); a game that fails or times out is recorded with its error instead.
+    """
+    return list(await asyncio.gather(*(_run_one(game, play, timeout) for game in range(games))))
+
+
+def report(results: List[MatchResult], seconds: float, caller: AgentCaller):
+    games = len(results)
+    finished = [result for result in results if result.error is None]
+    print(f"{games} games in {seconds:.2f}s: {games / max(seconds, 1e-9):.2f} games/s, "
+          f"concurrency {caller.concurrency}")
+    print(f"{caller.calls} agent calls, {caller.rate_limited} rate limited, {caller.waited:.1f}s of backoff")
+    for outcome, count in Counter(result.result for result in finished).most_common():
+        print(f"  {outcome}: {count}")
+    errors = Counter(result.error.split(':')[0] for result in results if result.error)
+    for error, count in errors.most_common():
+        print(f"  error {error}: {count}")
+    if finished:
+        durations = sorted(result.seconds for result in finished)
+        print(f"game time: median {durations[len(durations) // 2]:.2f}s, max {durations[-1]:.2f}s, "
+              f"{sum(result.moves for result in finished) / len(finished):.1f} moves per game")
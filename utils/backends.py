@@ -0,0 +1,190 @@
+# Model backends for the LLM agents, so the game loops can be timed without a live API
+#
+#   live      the agents as built, calling the provider
+#   record    live, with every request, response and its latency appended to a JSONL trace
+#   replay    responses served from a trace after the recorded latency times --latency-scale
+#   stand-in  a scripted local model (utils.arena.StandInModel) answering after --latency-ms
+#
+# Trace records are keyed like the response cache (model, instructions and prompt). A replay
+# serves the responses recorded for a key in order, so a game that makes the same requests as
+# its recording (same --seed) plays out the same way.
+#
+# Usage:
+#   python wordle/wordle.py --backend record --trace wordle.jsonl --seed 1
+#   python wordle/wordle.py --backend replay --trace wordle.jsonl --seed 1 --latency-scale 0
+#   python -m utils.backends wordle.jsonl        # summary of a trace
+
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from utils.llm_cache import cache_key, model_name
+
+BACKENDS = ('live', 'record', 'replay', 'stand-in')
+TRACE_FILE = 'agents-trace.jsonl'
+
+
+def _key(agent, prompt: str) -> str:
+    return cache_key(model_name(agent), getattr(agent, 'instructions', None), prompt)
+
+
+class RecordingAgent(object):
+    """Passes run()/arun() on to `agent` and appends each request, response and latency to `path`"""
+
+    def __init__(self, agent, path: str = TRACE_FILE):
+        self.agent = agent
+        self.path = path
+        self.model_name = model_name(agent)
+        self.instructions = getattr(agent, 'instructions', None)
+
+    def deep_copy(self):
+        return RecordingAgent(self.agent.deep_copy() if hasattr(self.agent, 'deep_copy') else self.agent, self.path)
+
+    def _record(self, prompt: str, content: str, latency: float, complete: bool = True):
+        record = {'key': _key(self.agent, prompt), 'model': self.model_name, 'prompt': prompt,
+                  'content': content, 'latency': round(latency, 6)}
+        if not complete:
+            # A stream the reader closed early: the text up to where it stopped
+            record['complete'] = False
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def run(self, message: str, stream: bool = False, **kwargs):
+        if stream:
+            return self._stream(message, **kwargs)
+        start = time.perf_counter()
+        response = self.agent.run(message, **kwargs)
+        self._record(message, response.content, time.perf_counter() - start)
+        return response
+
+    def _stream(self, message: str, **kwargs):
+        start = time.perf_counter()
+        parts = []
+        try:
+            for chunk in self.agent.run(message, stream=True, **kwargs):
+                parts.append(chunk.content or '')
+                yield chunk
+        except GeneratorExit:
+            self._record(message, ''.join(parts), time.perf_counter() - start, complete=False)
+            raise
+        self._record(message, ''.join(parts), time.perf_counter() - start)
+
+    async def arun(self, message: str, **kwargs):
+        start = time.perf_counter()
+        response = await self.agent.arun(message, **kwargs)
+        self._record(message, response.content, time.perf_counter() - start)
+        return response
+
+
+def load_trace(path: str) -> Dict[str, List[dict]]:
+    """Records of a trace file by key, in the order they were recorded"""
+    trace = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                trace[record['key']].append(record)
+    return dict(trace)
+
+
+class ReplayAgent(object):
+    """
+    Stands in for `agent` with the responses recorded for it in `trace`. The n-th request for a
+    prompt gets the n-th response recorded for it (wrapping around), after its latency times
+    `latency_scale`. Prompts that were never recorded raise KeyError. A stream the reader closed
+    early replays the text it had read, which is where the same reader stops again.
+    """
+
+    def __init__(self, agent, trace: Dict[str, List[dict]], latency_scale: float = 1.0):
+        self.agent = agent
+        self.model_name = model_name(agent)
+        self.instructions = getattr(agent, 'instructions', None)
+        self.trace = trace
+        self.latency_scale = latency_scale
+        self.served = defaultdict(int)
+
+    def deep_copy(self):
+        return ReplayAgent(self.agent, self.trace, self.latency_scale)
+
+    def _next(self, prompt: str) -> dict:
+        key = _key(self.agent, prompt)
+        records = self.trace.get(key)
+        if not records:
+            raise KeyError(f"No recorded response for {self.model_name} to prompt {prompt[:60]!r}...")
+        record = records[self.served[key] % len(records)]
+        self.served[key] += 1
+        return record
+
+    def run(self, message: str, stream: bool = False, **kwargs):
+        record = self._next(message)
+        time.sleep(record['latency'] * self.latency_scale)
+        response = SimpleNamespace(content=record['content'])
+        return iter([response]) if stream else response
+
+    async def arun(self, message: str, **kwargs):
+        import asyncio
+        record = self._next(message)
+        await asyncio.sleep(record['latency'] * self.latency_scale)
+        return SimpleNamespace(content=record['content'])
+
+
+_traces = {}
+
+
+def backend(agent, args, respond: Callable[[str], str]):
+    """
+    `agent` on the backend chosen by the add_arguments options. `respond(prompt)` scripts the
+    reply of the stand-in. Local players are returned as they are.
+    """
+    if args.backend == 'live' or hasattr(agent, 'next_guess') or hasattr(agent, 'next_move'):
+        return agent
+    if args.backend == 'record':
+        return RecordingAgent(agent, args.trace)
+    if args.backend == 'replay':
+        if args.trace not in _traces:
+            _traces[args.trace] = load_trace(args.trace)
+        return ReplayAgent(agent, _traces[args.trace], args.latency_scale)
+    from utils.arena import StandInModel
+    latency = args.latency_ms / 1e3
+    return StandInModel(respond, latency, latency / 3, token_delay=args.token_ms / 1e3)
+
+
+def add_arguments(parser: argparse.ArgumentParser, seed: bool = True):
+    parser.add_argument("--backend", choices=BACKENDS, default="live", help="where the LLM agents get their replies")
+    parser.add_argument("--trace", default=TRACE_FILE, help="trace file written by record and read by replay")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="replay latency as a multiple of the recorded one")
+    parser.add_argument("--latency-ms", type=float, default=300, help="stand-in reply latency")
+    parser.add_argument("--token-ms", type=float, default=20, help="stand-in time per generated word")
+    if seed:
+        parser.add_argument("--seed", type=int, help="seed of the random choices, so replays make the recorded requests")
+
+
+def seed(args):
+    if args.seed is not None:
+        random.seed(args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a recorded agent trace")
+    parser.add_argument("trace")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace)
+    records = [record for records in trace.values() for record in records]
+    partial = sum(1 for record in records if not record.get('complete', True))
+    print(f"{len(records)} responses to {len(trace)} distinct requests, {partial} streams closed early")
+    by_model = defaultdict(list)
+    for record in records:
+        by_model[record['model']].append(record['latency'])
+    for model, latencies in sorted(by_model.items()):
+        latencies.sort()
+        print(f"  {model}: {len(latencies)} calls, median {latencies[len(latencies) // 2] * 1e3:.0f}ms, "
+              f"max {latencies[-1] * 1e3:.0f}ms, total {sum(latencies):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
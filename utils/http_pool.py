@@ -0,0 +1,390 @@
+# Process-wide HTTP clients shared by every agent
+#
+# phi's OpenAI-style models build a new OpenAI client, with its own connection pool, for every
+# request, so no connection is ever reused. PooledDeepSeekChat takes its clients from here
+# instead: one keep-alive pool per endpoint and API key (HTTP/2 when the h2 package is installed),
+# shared by all agents of the process. The pool size and the connections allowed per host are
+# set with configure() or AGENTS_HTTP_POOL_SIZE / AGENTS_HTTP_PER_HOST. Every pool counts the
+# requests it sends and the connections it opens; the rest of the requests reused a connection.
+#
+# Usage:
+#   python -m utils.http_pool bench [--requests 200] [--concurrency 16]   # against a local server
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import httpx
+
+POOL_SIZE = int(os.environ.get('AGENTS_HTTP_POOL_SIZE', 32))
+PER_HOST = int(os.environ.get('AGENTS_HTTP_PER_HOST', 16))
+KEEPALIVE_EXPIRY = 60.0
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class PoolStats(object):
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def reused(self) -> int:
+        return self.requests - self.connections
+
+
+class _Counter(object):
+    """Per-host slots and the counters of one pool"""
+
+    def __init__(self, per_host: int, stats: PoolStats, lock_type):
+        self.per_host = per_host
+        self.stats = stats
+        self.slots = defaultdict(lambda: lock_type(per_host))
+
+    def trace_event(self, event: str):
+        # httpcore reports every new TCP connection through the 'trace' request extension
+        if event == 'connection.connect_tcp.complete':
+            self.stats.connections += 1
+
+
+def _pool_timeout(request: httpx.Request) -> Optional[float]:
+    # Waiting for a host slot counts as waiting for the pool, like httpx's own pool timeout
+    return request.extensions.get('timeout', {}).get('pool')
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees its host slot once closed, so streamed responses keep the slot while read"""
+
+    def __init__(self, stream, slot):
+        self.stream = stream
+        self.slot = slot
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            if self.slot is not None:
+                self.slot.release()
+                self.slot = None
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, slot):
+        self.stream = stream
+        self.slot = slot
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if self.slot is not None:
+                self.slot.release()
+                self.slot = None
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """httpx transport allowing at most `per_host` requests in flight to each host"""
+
+    def __init__(self, per_host: int, stats: PoolStats, **options):
+        self.transport = httpx.HTTPTransport(**options)
+        self.counter = _Counter(per_host, stats, threading.BoundedSemaphore)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions['trace'] = lambda event, info: self.counter.trace_event(event)
+        self.counter.stats.requests += 1
+        slot = self.counter.slots[request.url.host]
+        if not slot.acquire(timeout=_pool_timeout(request)):
+            raise httpx.PoolTimeout(f"No free slot for {request.url.host} ({self.counter.per_host} in flight)")
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        return httpx.Response(response.status_code, headers=response.headers, extensions=response.extensions,
+                              stream=_ReleasingStream(response.stream, slot))
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """LimitedTransport for httpx.AsyncClient"""
+
+    def __init__(self, per_host: int, stats: PoolStats, **options):
+        self.transport = httpx.AsyncHTTPTransport(**options)
+        self.counter = _Counter(per_host, stats, asyncio.Semaphore)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async def trace(event, info):
+            self.counter.trace_event(event)
+        request.extensions['trace'] = trace
+        self.counter.stats.requests += 1
+        slot = self.counter.slots[request.url.host]
+        try:
+            await asyncio.wait_for(slot.acquire(), _pool_timeout(request))
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout(f"No free slot for {request.url.host} ({self.counter.per_host} in flight)")
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        return httpx.Response(response.status_code, headers=response.headers, extensions=response.extensions,
+                              stream=_AsyncReleasingStream(response.stream, slot))
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+_settings = {'pool_size': POOL_SIZE, 'per_host': PER_HOST, 'http2': None}
+_clients: Dict[tuple, object] = {}
+stats: Dict[str, PoolStats] = defaultdict(PoolStats)
+
+
+def configure(pool_size: int = None, per_host: int = None, http2: Optional[bool] = None):
+    """Limits of the pools created from now on. http2=None uses HTTP/2 when h2 is installed"""
+    for name, value in (('pool_size', pool_size), ('per_host', per_host), ('http2', http2)):
+        if value is not None:
+            _settings[name] = value
+
+
+def _options() -> dict:
+    http2 = http2_available() if _settings['http2'] is None else _settings['http2']
+    limits = httpx.Limits(max_connections=_settings['pool_size'], max_keepalive_connections=_settings['pool_size'],
+                          keepalive_expiry=KEEPALIVE_EXPIRY)
+    return {'http2': http2, 'limits': limits}
+
+
+def client(name: str = 'default') -> httpx.Client:
+    """The shared httpx.Client of pool `name`"""
+    key = ('sync', name)
+    if key not in _clients:
+        _clients[key] = httpx.Client(transport=LimitedTransport(_settings['per_host'], stats[name], **_options()))
+    return _clients[key]
+
+
+def async_client(name: str = 'default') -> httpx.AsyncClient:
+    """
+    The shared httpx.AsyncClient of pool `name` for the running event loop. Connections belong to
+    the loop that opened them, so each asyncio.run() gets its own client (with the same counters).
+    """
+    loop = asyncio.get_running_loop()
+    key = ('async', name)
+    cached = _clients.get(key)
+    if cached is None or cached[0] is not loop:
+        transport = AsyncLimitedTransport(_settings['per_host'], stats[name], **_options())
+        _clients[key] = (loop, httpx.AsyncClient(transport=transport))
+    return _clients[key][1]
+
+
+def _pool_name(params: dict) -> str:
+    # Agents with different API keys do not share connections; the name only shows a digest of the key
+    key = hashlib.sha256(str(params.get('api_key')).encode()).hexdigest()[:8]
+    return f"{params.get('base_url')} (key {key})"
+
+
+_openai_clients = {}
+
+
+def openai_client(params: dict):
+    """An OpenAI client for `params` (as built by phi's get_client_params) on the shared pool"""
+    from openai import OpenAI
+    name = _pool_name(params)
+    if name not in _openai_clients:
+        _openai_clients[name] = OpenAI(**params, http_client=client(name))
+    return _openai_clients[name]
+
+
+def async_openai_client(params: dict):
+    from openai import AsyncOpenAI
+    name = _pool_name(params)
+    http_client = async_client(name)
+    cached = _openai_clients.get(('async', name))
+    if cached is None or cached[0] is not http_client:
+        _openai_clients[('async', name)] = (http_client, AsyncOpenAI(**params, http_client=http_client))
+    return _openai_clients[('async', name)][1]
+
+
+@functools.lru_cache(maxsize=None)
+def _pooled_class():
+    from phi.model.deepseek import DeepSeekChat
+
+    class PooledDeepSeekChat(DeepSeekChat):
+        def get_client(self):
+            return self.client or openai_client(self.get_client_params())
+
+        def get_async_client(self):
+            return self.async_client or async_openai_client(self.get_client_params())
+
+        # phi's versions leave closing the response to the garbage collector when the caller stops
+        # reading early (openai's Stream is a reference cycle), and until then the response holds
+        # its host slot and its connection. These close it as soon as the stream is abandoned.
+        def invoke_stream(self, messages):
+            stream = self.get_client().chat.completions.create(
+                model=self.id, messages=[self.format_message(m) for m in messages], stream=True,
+                stream_options={"include_usage": True}, **self.request_kwargs)
+            try:
+                yield from stream
+            finally:
+                stream.close()
+
+        async def ainvoke_stream(self, messages):
+            stream = await self.get_async_client().chat.completions.create(
+                model=self.id, messages=[self.format_message(m) for m in messages], stream=True,
+                stream_options={"include_usage": True}, **self.request_kwargs)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.close()
+
+    return PooledDeepSeekChat
+
+
+def pooled_model(model_id: str, **options):
+    """A DeepSeek model whose requests go through the shared pools"""
+    return _pooled_class()(id=model_id, **options)
+
+
+def report() -> str:
+    if not stats:
+        return "HTTP pools: no requests"
+    requests = sum(pool.requests for pool in stats.values())
+    connections = sum(pool.connections for pool in stats.values())
+    return (f"HTTP pools: {len(stats)} pools, {requests} requests over {connections} connections "
+            f"({requests - connections} reused)")
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a chat completion endpoint: answers any POST after `delay` seconds, streamed if asked"""
+    protocol_version = 'HTTP/1.1'
+    delay = 0.02
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        time.sleep(self.delay)
+        if request.get('stream'):
+            return self.stream()
+        body = json.dumps({
+            'id': 'stand-in', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'stand-in',
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': '1, 1'}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self):
+        """The reply as server-sent events, a word every `delay` seconds, like a streamed completion"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        words = ['1, 1', '\n\nThe', ' centre', ' keeps', ' the', ' most', ' lines', ' open.']
+        try:
+            for word in words:
+                chunk = {'id': 'stand-in', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': 'stand-in', 'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]}
+                self._send_event(json.dumps(chunk))
+                time.sleep(self.delay)
+            self._send_event('[DONE]')
+            self.wfile.write(b'0\r\n\r\n')
+        except OSError:
+            # The client stopped reading and closed the connection
+            pass
+
+    def _send_event(self, data: str):
+        event = f"data: {data}\n\n".encode()
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def stand_in_server(delay: float = 0.02) -> ThreadingHTTPServer:
+    """A stand-in HTTP server on a free local port, serving from a thread; .connections counts accepted connections"""
+    handler = type('Handler', (_StandInHandler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench(requests: int, concurrency: int, delay: float):
+    server = stand_in_server(delay)
+    url = f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+    payload = {'model': 'stand-in', 'messages': [{'role': 'user', 'content': 'move'}]}
+
+    async def one_client_per_request(semaphore):
+        # What phi does without the pool: a new client for every request
+        async with semaphore, httpx.AsyncClient() as fresh:
+            (await fresh.post(url, json=payload)).raise_for_status()
+
+    async def shared(semaphore):
+        async with semaphore:
+            (await async_client('bench').post(url, json=payload)).raise_for_status()
+
+    for label, send in (("new client per request", one_client_per_request), ("shared pool", shared)):
+        server.connections = 0
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(send(semaphore) for _ in range(requests)))
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        seconds = time.perf_counter() - start
+        print(f"{label}: {requests} requests in {seconds:.2f}s ({requests / seconds:.0f}/s), "
+              f"server accepted {server.connections} connections")
+    pool = stats['bench']
+    print(f"shared pool counters: {pool.requests} requests, {pool.connections} connections opened, "
+          f"{pool.reused} reused (pool size {_settings['pool_size']}, {_settings['per_host']} per host, "
+          f"HTTP/2 {'on' if _options()['http2'] else 'off, h2 not installed'})")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared HTTP connection pools of the agents")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench_parser = subparsers.add_parser("bench", help="compare a new client per request with the shared pool")
+    bench_parser.add_argument("--requests", type=int, default=200)
+    bench_parser.add_argument("--concurrency", type=int, default=16)
+    bench_parser.add_argument("--delay-ms", type=float, default=20, help="stand-in server response time")
+    bench_parser.add_argument("--pool-size", type=int, default=POOL_SIZE)
+    bench_parser.add_argument("--per-host", type=int, default=PER_HOST)
+    args = parser.parse_args()
+
+    configure(args.pool_size, args.per_host)
+    bench(args.requests, args.concurrency, args.delay_ms / 1e3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# Console scripts of setup.py
+#
+# The game directories are not regular packages: their modules import each other as top-level
+# modules (from wordle_game import WordleGame), which resolves when they are run as scripts. The
+# entry points do the same: put the game's directory first on sys.path and run its main().
+
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(directory: str, module: str):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+    importlib.import_module(module).main()
+
+
+def wordle():
+    _run('wordle', 'wordle')
+
+
+def tictactoe():
+    _run('tic_tac_toe', 'tic_tac_toe')
@@ -0,0 +1,259 @@
+# On-disk cache of LLM agent responses
+#
+# Responses are stored in one SQLite file, keyed by the SHA-256 of the model, the agent's
+# instructions and the prompt, so the same request for the same agent is answered without a
+# network call. The cache is bounded by the total size of the stored responses: the least
+# recently used ones are evicted first. Entries can also expire after a TTL. Concurrent games
+# asking the same thing share one request instead of each making their own.
+#
+# Usage:
+#   python utils/llm_cache.py stats [--path responses.sqlite]
+#   python utils/llm_cache.py clear
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+CACHE_DIR = os.environ.get('LLM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'agents', 'llm'))
+CACHE_FILE = os.path.join(CACHE_DIR, 'responses.sqlite')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+
+def model_name(agent) -> str:
+    if isinstance(getattr(agent, 'model_name', None), str):
+        # Wrappers and agents.LazyAgent know it without building the agent
+        return agent.model_name
+    model = getattr(agent, 'model', None)
+    return f"{getattr(model, 'name', None) or type(model).__name__}:{getattr(model, 'id', None)}"
+
+
+def cache_key(model: str, instructions, prompt: str) -> str:
+    return hashlib.sha256(json.dumps([model, instructions, prompt]).encode()).hexdigest()
+
+
+COUNTERS = ('hits', 'shared', 'misses', 'expired', 'evicted')
+# Key suffix of the responses of streams closed before the end
+PARTIAL = ':partial'
+
+
+class ResponseCache(object):
+    """
+    Responses by key in a SQLite file. At most `max_bytes` of responses are kept (least recently
+    used evicted first); with `ttl` set, entries older than `ttl` seconds are misses.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, max_bytes: int = 64 << 20, ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.shared = 0
+        # Futures of the requests in flight by key, for arun()
+        self.pending = {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit; several processes of a simulation can share the file
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT content, created FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is not None and self.ttl is not None and row[1] < now - self.ttl:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.expired += 1
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, content: str):
+        now = time.time()
+        self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, model, content, len(content.encode()), now, now))
+        self.evict()
+
+    def evict(self):
+        """Drop the least recently used responses until the stored ones fit in max_bytes"""
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return
+        drop = []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY used"):
+            if excess <= 0:
+                break
+            drop.append((key,))
+            excess -= size
+        self.db.executemany("DELETE FROM responses WHERE key = ?", drop)
+        self.evicted += len(drop)
+
+    def size(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        self.db.execute("DELETE FROM responses")
+
+    def counters(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in COUNTERS}
+
+    def add_counters(self, counters: Dict[str, int]):
+        """Count the lookups another instance made, such as the cache of a worker process"""
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + counters.get(name, 0))
+
+    def report(self) -> str:
+        lookups = self.hits + self.shared + self.misses
+        return (f"LLM cache: {self.hits} hits, {self.shared} shared in flight, {self.misses} misses"
+                + (f" ({(self.hits + self.shared) / lookups:.0%} hit rate)" if lookups else '')
+                + f", {self.expired} expired, {self.evicted} evicted; {len(self)} responses, {self.size()} bytes")
+
+
+class CachedAgent(object):
+    """
+    Wraps an LLM agent so run()/arun() are answered from `cache` when possible. Responses have
+    only .content. Agents do not send their history, so a response depends only on the model, the
+    instructions and the prompt. A prompt sent again right after its own response is a retry of
+    a rejected answer: it goes to the model and replaces the cached response. arun() calls for a
+    prompt that is already being asked wait for that answer. A stream closed before the end is
+    stored as far as it was read, under a key of its own that only streamed requests use: those
+    readers stop at the same point, whole-response requests must not get the cut-off text.
+    """
+
+    def __init__(self, agent, cache: ResponseCache):
+        self.agent = agent
+        self.cache = cache
+        self.model_name = model_name(agent)
+        self.last_key = None
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def deep_copy(self):
+        return CachedAgent(self.agent.deep_copy() if hasattr(self.agent, 'deep_copy') else self.agent, self.cache)
+
+    def _key(self, message: str):
+        key = cache_key(self.model_name, getattr(self.agent, 'instructions', None), message)
+        retry = key == self.last_key
+        self.last_key = key
+        return key, None if retry else self.cache.get(key), retry
+
+    def run(self, message: str, stream: bool = False, **kwargs):
+        key, content, retry = self._key(message)
+        if stream:
+            if content is None and not retry:
+                content = self.cache.get(key + PARTIAL)
+                # One lookup, whichever of the two answered: the first one already counted a miss
+                self.cache.misses -= 1
+            return iter([SimpleNamespace(content=content)]) if content is not None else self._stream(key, message, **kwargs)
+        if content is None:
+            content = self.agent.run(message, **kwargs).content
+            self.cache.put(key, self.model_name, content)
+        return SimpleNamespace(content=content)
+
+    def _stream(self, key: str, message: str, **kwargs):
+        parts = []
+        try:
+            for chunk in self.agent.run(message, stream=True, **kwargs):
+                parts.append(chunk.content or '')
+                yield chunk
+        except GeneratorExit:
+            # Closed by the reader once it had what it needed
+            if parts:
+                self.cache.put(key + PARTIAL, self.model_name, ''.join(parts))
+            raise
+        self.cache.put(key, self.model_name, ''.join(parts))
+
+    async def arun(self, message: str, **kwargs):
+        key, content, retry = self._key(message)
+        if content is not None:
+            return SimpleNamespace(content=content)
+
+        import asyncio
+        pending = self.cache.pending.get(key)
+        if pending is not None and not retry:
+            await asyncio.wait([pending])
+            # When that request failed, make our own
+            if not pending.cancelled():
+                self.cache.misses -= 1
+                self.cache.shared += 1
+                return SimpleNamespace(content=pending.result())
+
+        pending = self.cache.pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            content = (await self.agent.arun(message, **kwargs)).content
+            self.cache.put(key, self.model_name, content)
+            pending.set_result(content)
+            return SimpleNamespace(content=content)
+        finally:
+            if not pending.done():
+                pending.cancel()
+            if self.cache.pending.get(key) is pending:
+                del self.cache.pending[key]
+
+
+def cached(agent, cache: Optional[ResponseCache]):
+    """`agent` answering from `cache`; local players and a None cache leave it as it is"""
+    if cache is None or hasattr(agent, 'next_guess') or hasattr(agent, 'next_move'):
+        return agent
+    return CachedAgent(agent, cache)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--cache", action="store_true", help=f"answer repeated LLM requests from {CACHE_FILE}")
+    parser.add_argument("--cache-ttl", type=float, help="seconds a cached response stays valid")
+    parser.add_argument("--cache-mb", type=float, default=64, help="size limit of the cached responses")
+
+
+def settings(args) -> Optional[dict]:
+    """
+    ResponseCache arguments from the add_arguments options, None without --cache. Unlike the
+    cache itself they can be sent to worker processes, which open the file on their side.
+    """
+    return {'max_bytes': int(args.cache_mb * (1 << 20)), 'ttl': args.cache_ttl} if args.cache else None
+
+
+def from_args(args) -> Optional[ResponseCache]:
+    """The cache asked for by the add_arguments options, None without --cache"""
+    options = settings(args)
+    return ResponseCache(**options) if options is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--path", default=CACHE_FILE)
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.path)
+    if args.command == 'clear':
+        cache.clear()
+    print(f"{args.path}: {len(cache)} responses, {cache.size()} bytes")
+
+
+if __name__ == "__main__":
+    main()
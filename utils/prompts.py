@@ -0,0 +1,77 @@
+import re
+from typing import List, NamedTuple
+
+# Words, numbers, runs of punctuation and single symbols, roughly how BPE tokenizers split text
+_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local estimate of the number of tokens of `text` for GPT-style BPE tokenizers: about one token
+    per 4 letters of a word, per 3 digits, per 2 symbols, and one per line break. It needs no
+    network or tokenizer download, which is enough to keep prompts within a budget.
+    """
+    tokens = text.count('\n')
+    for piece in _PIECES.findall(text):
+        if piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += (len(piece) + 1) // 2
+    return tokens
+
+
+class Section(NamedTuple):
+    text: str
+    priority: int
+    tokens: int
+
+
+class PromptBuilder(object):
+    """
+    Builds prompts out of sections within a token budget. Sections keep the order they were added
+    in; when the prompt does not fit, the sections with the lowest priority are dropped first.
+    Sections with priority None are always kept. The size of every built prompt is recorded.
+    """
+
+    def __init__(self, budget: int = 300):
+        self.budget = budget
+        self.sections: List[Section] = []
+        self.sizes: List[int] = []
+        self.dropped: List[int] = []
+
+    def add(self, text: str, priority: int = None) -> 'PromptBuilder':
+        if text:
+            self.sections.append(Section(text.strip(), priority, estimate_tokens(text)))
+        return self
+
+    def build(self) -> str:
+        sections = list(self.sections)
+        total = sum(section.tokens for section in sections)
+        optional = sorted((section for section in sections if section.priority is not None), key=lambda s: s.priority)
+        dropped = 0
+        for section in optional:
+            if total <= self.budget:
+                break
+            sections.remove(section)
+            total -= section.tokens
+            dropped += 1
+
+        prompt = '\n\n'.join(section.text for section in sections)
+        self.sizes.append(estimate_tokens(prompt))
+        self.dropped.append(dropped)
+        self.sections = []
+        return prompt
+
+    @property
+    def last_size(self) -> int:
+        return self.sizes[-1] if self.sizes else 0
+
+    def report(self) -> str:
+        """One line with the prompt size of every turn so far"""
+        if not self.sizes:
+            return "No prompts built"
+        turns = ', '.join(f"{size}" + (f" (-{dropped})" if dropped else '') for size, dropped in zip(self.sizes, self.dropped))
+        return (f"Prompt tokens per turn (budget {self.budget}): {turns}; "
+                f"total {sum(self.sizes)}, max {max(self.sizes)}")
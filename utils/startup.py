@@ -0,0 +1,88 @@
+# Startup time of the console scripts
+#
+# Runs each command in a fresh interpreter a few times and reports the median wall time, then
+# runs it once more under `python -X importtime` and lists the imports that cost the most, with
+# a warning when phidata, openai or NumPy were loaded. `python -c pass` is measured first as the
+# floor every command pays.
+#
+# Usage:
+#   python -m utils.startup                                  # --help and the local-only modes
+#   python -m utils.startup --repeat 10 --top 15 "tictactoe --x perfect --o perfect"
+
+import argparse
+import os
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = {'wordle', 'tictactoe'}
+HEAVY = ('phi', 'openai', 'numpy', 'rich')
+
+COMMANDS = [
+    "wordle --help",
+    "tictactoe --help",
+    "tictactoe --x perfect --o perfect",
+    "tic_tac_toe/tic_tac_toe_solver.py table",
+]
+
+_IMPORT = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def argv(command: str) -> List[str]:
+    """Interpreter arguments for a console script name or a script path, with its arguments"""
+    name, *args = shlex.split(command)
+    if name in ENTRY_POINTS:
+        return ['-c', f'from utils.launch import {name}; {name}()', *args]
+    if name == 'pass':
+        return ['-c', 'pass']
+    return [os.path.join(ROOT, name), *args]
+
+
+def run(args: List[str], importtime: bool = False) -> Tuple[float, str]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *(['-X', 'importtime'] if importtime else []), *args],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, result.stderr
+
+
+def imports(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, microseconds including its own imports, depth) of every import in an importtime report"""
+    return [(match.group(4), int(match.group(2)), len(match.group(3)) // 2)
+            for match in map(_IMPORT.match, stderr.splitlines()) if match]
+
+
+def benchmark(command: str, repeat: int, top: int):
+    args = argv(command)
+    times = sorted(run(args)[0] for _ in range(repeat))
+    print(f"{command}: median {statistics.median(times) * 1e3:.0f} ms, min {times[0] * 1e3:.0f} ms")
+    if top:
+        report = imports(run(args, importtime=True)[1])
+        direct = sorted((entry for entry in report if entry[2] == 0), key=lambda entry: -entry[1])
+        for module, micros, _ in direct[:top]:
+            print(f"  {micros / 1e3:8.1f} ms  {module}")
+        loaded = sorted({module.split('.')[0] for module, _, _ in report} & set(HEAVY))
+        if loaded:
+            print(f"  loaded: {', '.join(loaded)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the startup time of the console scripts")
+    parser.add_argument("commands", nargs="*", default=COMMANDS,
+                        help="console script (wordle, tictactoe) or script path, with its arguments")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="number of most expensive imports to list")
+    args = parser.parse_args()
+
+    benchmark('pass', args.repeat, 0)
+    for command in args.commands:
+        benchmark(command, args.repeat, args.top)
+
+
+if __name__ == "__main__":
+    main()
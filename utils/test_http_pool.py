@@ -0,0 +1,50 @@
+# Streams abandoned early must give their host slot and connection back
+#
+# Usage (from the repository root):
+#   python -m pytest utils
+
+import asyncio
+
+import pytest
+
+from utils import http_pool
+
+pytest.importorskip('phi')
+
+STREAMS = 5
+
+
+@pytest.fixture
+def agent():
+    from phi.agent import Agent
+    server = http_pool.stand_in_server(delay=0.01)
+    http_pool.configure(per_host=2)
+    # A leaked slot fails the next request after 5s instead of blocking forever
+    model = http_pool.pooled_model('stand-in', api_key='test', base_url=f"http://127.0.0.1:{server.server_address[1]}",
+                                   timeout=5)
+    yield Agent(model=model)
+    http_pool.configure(per_host=http_pool.PER_HOST)
+    server.shutdown()
+
+
+def test_streams_closed_early_release_their_slot(agent):
+    for _ in range(STREAMS):
+        chunks = agent.run("move", stream=True)
+        assert next(chunks).content == '1, 1'
+        chunks.close()
+
+
+def test_async_streams_closed_early_release_their_slot(agent):
+    async def play():
+        for _ in range(STREAMS):
+            chunks = await agent.arun("move", stream=True)
+            assert (await chunks.__anext__()).content == '1, 1'
+            await chunks.aclose()
+
+    asyncio.run(play())
+
+
+def test_streams_read_to_the_end(agent):
+    for _ in range(STREAMS):
+        content = ''.join(chunk.content or '' for chunk in agent.run("move", stream=True))
+        assert content.startswith('1, 1')
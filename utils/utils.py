@@ -1,10 +1,72 @@
 import json
-import re
+from typing import Iterable, Iterator, List
+
+
+class JSONStream(object):
+    """
+    Finds the JSON objects in text that arrives in chunks, such as a streamed LLM response. It
+    keeps track of the nesting depth and of whether it is inside a string between chunks, so an
+    object is returned by the feed() call that brings its closing brace, whatever comes after.
+    Braces in prose that do not enclose valid JSON are skipped.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.parts: List[str] = []
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, chunk: str) -> List[dict]:
+        """The objects completed by `chunk`"""
+        found = []
+        start = 0
+        for i, char in enumerate(chunk):
+            if self.depth == 0:
+                if char == '{':
+                    self.depth = 1
+                    start = i
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    text = ''.join(self.parts) + chunk[start:i + 1]
+                    self.reset()
+                    try:
+                        found.append(json.loads(text))
+                    except json.JSONDecodeError:
+                        # Not JSON after all ("{like this}"): look for objects inside it instead
+                        found.extend(JSONStream().feed(text[1:]))
+        if self.depth:
+            self.parts.append(chunk[start:])
+        return [value for value in found if isinstance(value, dict)]
+
+
+def iter_json(chunks: Iterable[str]) -> Iterator[dict]:
+    """The JSON objects in a stream of text chunks, each yielded as soon as it is complete"""
+    stream = JSONStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+
 
 def extract_json(s):
     """
     LLMs returns JSON code in their responses. Sometimes inside a ```json ``` markdown, and sometimes just RAW json
-    This function extracts the JSON code from their responses, considering all cases
+    This function extracts the JSON code from their responses, considering all cases: raw, fenced or surrounded by
+    text, nested or not, the first complete JSON object is returned (None if there is none)
 
 
     :param s:
@@ -13,16 +75,6 @@ def extract_json(s):
     # Attempt to extract JSON directly if not wrapped in markdown
     try:
         return json.loads(s)
-    except json.JSONDecodeError:
-        # Fallback to extracting JSON from markdown format
-        pattern = r'```json\s*({.*?})\s*```'
-        match = re.search(pattern, s, re.DOTALL)
-        if match:
-            json_str = match.group(1)
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"Invalid JSON: {e}")
-                return None
-        else:
-            return None
\ No newline at end of file
+    except (json.JSONDecodeError, TypeError):
+        # Fallback to the first object in the text, wherever it is
+        return next(iter_json([s or '']), None)
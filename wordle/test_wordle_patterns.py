@@ -0,0 +1,42 @@
+# The scalar and batched feedback scoring must agree
+#
+# Usage (from the repository root):
+#   python -m pytest wordle
+
+import itertools
+import random
+
+import numpy as np
+
+from wordle_patterns import decode_pattern, encode_pattern, encode_words, score_pattern, score_patterns
+
+# Repeated letters on both sides are where the two-pass rule matters
+WORDS = ['crane', 'slate', 'speed', 'erase', 'geese', 'eerie', 'abbey', 'babes', 'llama', 'allay',
+         'mamma', 'sassy', 'asses', 'tests', 'otter', 'toter', 'robot', 'boost', 'vivid', 'civic']
+
+
+def random_words(count, seed=0):
+    rng = random.Random(seed)
+    # A small alphabet makes repeated letters common
+    return [''.join(rng.choice('abcde') for _ in range(5)) for _ in range(count)]
+
+
+def test_known_patterns():
+    assert ''.join(score_pattern('crane', 'crane')) == '+++++'
+    assert ''.join(score_pattern('speed', 'erase')) == '*#**#'
+    assert ''.join(score_pattern('geese', 'eerie')) == '#+*#+'
+    assert ''.join(score_pattern('sassy', 'asses')) == '**+*#'
+
+
+def test_scalar_and_batch_agree_on_all_pairs():
+    words = WORDS + random_words(200)
+    codes = encode_words(words)
+    matrix = score_patterns(codes[:, np.newaxis, :], codes)
+    for (i, guess), (j, answer) in itertools.product(enumerate(words), repeat=2):
+        assert encode_pattern(score_pattern(guess, answer)) == matrix[i, j], (guess, answer)
+
+
+def test_scalar_and_batch_agree_one_pair_at_a_time():
+    for guess, answer in zip(random_words(500, seed=1), random_words(500, seed=2)):
+        batch = score_patterns(encode_words([guess])[0], encode_words([answer])[0])
+        assert score_pattern(guess, answer) == decode_pattern(batch), (guess, answer)
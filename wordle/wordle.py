@@ -1,18 +1,12 @@
-from dotenv import load_dotenv
-from rich import print as rprint
+import argparse
+import time
 
-from utils.utils import extract_json
-from wordle_game import WordleGame
+from utils import agents, backends, llm_cache
 
-load_dotenv()
-
-from phi.agent import Agent
-from phi.model.deepseek import DeepSeekChat
-
-# Create a model
-model: DeepSeekChat = DeepSeekChat(id = "deepseek-chat")
-guess_agent = Agent(
-    model = model,
+# The agents are built on first use (see utils/agents.py), and the game modules, NumPy and rich
+# are imported once the arguments are parsed, so --help starts without them
+guess_agent = agents.register(
+    "wordle-guesser",
     instructions = [
         "You are a professional Wordle player",
         "Rules:",
@@ -33,8 +27,8 @@ guess_agent = Agent(
     reasoning = False
 )
 
-evaluator_agent = Agent(
-    model = model,
+evaluator_agent = agents.register(
+    "wordle-judge",
     instructions = [
         "You are the judge in the game Wordle",
         "On each input, you will receive a guess for the hidden word",
@@ -52,65 +46,66 @@ evaluator_agent = Agent(
 )
 
 
-def play_with_evaluator():
+def local_feedback(game) -> str:
+    """The judge's feedback on the last guess, built from the game state instead of asking evaluator_agent"""
+    guess = game.previous_words[-1]
+    return f"""Guess {game.tries}/{game.max_tries}: {guess} -> {''.join(game.evaluations[game.tries - 1])}
+{game.knowledge.summary()}
+Tries left: {game.max_tries - game.tries}"""
+
+
+def stand_in_feedback(prompt: str) -> str:
+    """Reply of the scripted stand-in judge: the game's own feedback line"""
+    return next((line for line in prompt.splitlines() if '->' in line), '')
+
 
+def play_with_evaluator(player = None, judge: str = 'local', prompt_budget: int = 300, cache = None, evaluator = None):
+    # player: guess_agent by default, or a local solver such as wordle_solver.EntropySolver()
+    # judge: 'local' builds the feedback from the game state, 'llm' asks evaluator (evaluator_agent by default)
+    # cache: an llm_cache.ResponseCache answering repeated agent requests
+    from rich import print as rprint
+    from wordle_game import WordleGame
+
+    player = player or guess_agent
+    evaluator = llm_cache.cached(evaluator or evaluator_agent, cache)
     game = WordleGame(
-        agent = guess_agent,
-        debug = True
+        agent = llm_cache.cached(player, cache),
+        debug = True,
+        # Rejected LLM guesses are sent back before they cost a try
+        hard_mode = not hasattr(player, 'next_guess'),
+        prompt_budget = prompt_budget
     )
     game.init()
 
-    prev_eval_response = ""
-    prev_guess = None
+    feedback = None
     is_correct = False
     while game.tries < game.max_tries and not is_correct:
         game.display_details()
         game.display_board()
-        prompt = f"""# Previous words used: {game.previous_words}"""
-
-        if game.get_discovered_word_state() != '$$$$$':
-            prompt += f"The hidden word follows the following pattern: {game.get_discovered_word_state()} (Discover all missing letters)"
-
-        if game.letters_not_in_word:
-            prompt += f"""# AVOID THE FOLLOWING LETTERS
-        The following letters are not in the word. DO NOT USE WORDS CONTAINING THESE LETTERS
-        The letters not in the target word are: [{','.join(game.letters_not_in_word)}]
-        """
-
-        if prev_eval_response:
-            prompt += f"""Your previous guess was: {prev_guess}
-The feedback provided by the game from your previous guesses os:
-{prev_eval_response}
-
---------------------
-Analyze previous feedbacks to choose a new word"""
-
-        player_response = guess_agent.run(prompt)
-        print("Player response:", player_response.content)
-        json_response = extract_json(player_response.content)
-
-        if 'guess' in json_response:
-            if isinstance(json_response['guess'], str):
-                guess_word = json_response['guess']
-            else:
-                guess_word = ''.join(list(json_response['guess'].values()))
-        else:
-            guess_word = ''.join(list(json_response.values()))
+        prompt = None
+        if not hasattr(game.agent, 'next_guess'):
+            # The local judge's feedback is already part of the prompt's state summary
+            prompt = game.build_prompt(notes = feedback if judge == 'llm' else None)
+
+        guess_word = game.ask_agent(prompt)
 
         rprint(f"[cyan]Player guess:[/] [yellow]{guess_word}[/]")
 
         is_correct = game.update_turn(guess_word)
-        prev_guess = guess_word
 
         # Evaluate
-        evaluator_response = evaluator_agent.run(f"""The hidden word is: {game.target_word}
+        start = time.perf_counter()
+        if judge == 'llm':
+            evaluator_response = evaluator.run(f"""The hidden word is: {game.target_word}
 The player guess is: {guess_word}
 
 The feedback from the game for player guess is: '{' '.join(list(guess_word))}' -> '{' '.join(game.evaluations[game.tries-1])}'
 
 Tries left: {game.max_tries - game.tries - 1}""")
-        rprint(f"[cyan]Evaluator response:[/] [yellow]{evaluator_response.content}[/]")
-        prev_eval_response += evaluator_response.content + "\n\n"
+            feedback = evaluator_response.content
+        else:
+            feedback = local_feedback(game)
+        rprint(f"[cyan]Evaluator response ({judge}, {(time.perf_counter() - start) * 1e3:.2f} ms):[/] [yellow]{feedback}[/]")
 
         if is_correct:
             rprint("[bold green]You won!🎉🎉[/]")
@@ -121,7 +116,33 @@ Tries left: {game.max_tries - game.tries - 1}""")
     game.display_board()
     if not is_correct:
         rprint(f"[bold red]Game Over😭! The word was: {game.target_word}[/]")
+    if game.prompts.sizes:
+        rprint(f"[dim]{game.prompts.report()}[/]")
+    if cache is not None:
+        rprint(f"[dim]{cache.report()}[/]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Let an agent play Wordle")
+    parser.add_argument("--player", choices=["llm", "solver", "solver-turns"], default="llm",
+                        help="the DeepSeek agent or the local entropy solver")
+    parser.add_argument("--judge", choices=["local", "llm"], default="local",
+                        help="build the feedback locally or ask the evaluator agent (an extra LLM call per turn)")
+    parser.add_argument("--prompt-budget", type=int, default=300, help="token budget of the guesser prompt")
+    backends.add_arguments(parser)
+    llm_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    backends.seed(args)
+    if args.player != 'llm':
+        from wordle_solver import EntropySolver
+        player = EntropySolver(strategy='turns' if args.player == 'solver-turns' else 'entropy')
+    else:
+        from wordle_game import stand_in_guess
+        player = backends.backend(guess_agent, args, stand_in_guess)
+    evaluator = backends.backend(evaluator_agent, args, stand_in_feedback)
+    play_with_evaluator(player, args.judge, args.prompt_budget, llm_cache.from_args(args), evaluator)
 
 
 if __name__ == '__main__':
-    play_with_evaluator()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -1,16 +1,35 @@
 # Wordle Game Logic and methods
 
-import requests
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
+import json
 import random
+import re
+import time
 from rich import print as rprint
 from rich.panel import Panel
 
-from phi.agent import Agent
-from utils.utils import extract_json
+from utils.prompts import PromptBuilder
+from utils.utils import JSONStream, extract_json
+from wordle_index import WordIndex, load_word_index, popcount
+from wordle_knowledge import WordleKnowledge
+from wordle_patterns import score_pattern
+from wordle_words import WordList, load_words
+
+if TYPE_CHECKING:
+    # Only for annotations: phidata takes most of a second to import
+    from phi.agent import Agent
+
+def stand_in_guess(prompt: str) -> str:
+    """Reply of the scripted stand-in guesser: the first example candidate in the prompt, any word on the first turn"""
+    match = re.search(r"Some of them: ([a-z, ]+)", prompt)
+    guess = match.group(1).split(', ')[0] if match else random.choice(load_words())
+    # Like an LLM, it keeps explaining after the answer
+    return json.dumps({'guess': guess}) + f"\n\n'{guess}' is one of the words that still fit every piece of " \
+        "feedback so far, and it tests several letters whose positions are not known yet."
+
 
 class WordleGame(object):
-    words: List[str] = None
+    words: WordList = None
     target_word: str = None
     tries: int
     max_tries: int = 6
@@ -19,28 +38,36 @@ class WordleGame(object):
     previous_words: List[str] = None
     score: int = 0
     letters_not_in_word: List[str] = None
-    agent: Agent = None
+    knowledge: WordleKnowledge = None
+    index: WordIndex = None
+    candidates: int = 0
+    candidate_count: int = 0
+    hard_mode: bool = False
+    max_retries: int = 2
+    prompts: PromptBuilder = None
+    agent: 'Agent' = None
     turn: int = 0
     debug: bool = False
 
-    def __init__(self, agent: Agent = None, debug: bool = False, max_tries: int = 6):
+    def __init__(self, agent: 'Agent' = None, debug: bool = False, max_tries: int = 6, hard_mode: bool = False,
+                 max_retries: int = 2, prompt_budget: int = 300, stream: bool = False):
         self.agent = agent
         self.turn = 0
         self.debug = debug
         self.max_tries = max_tries
+        # In hard mode every guess must be consistent with the feedback so far
+        self.hard_mode = hard_mode
+        # How many times a rejected guess is sent back to an LLM agent
+        self.max_retries = max_retries
+        # Token budget of the prompt sent to an LLM agent each turn
+        self.prompt_budget = prompt_budget
+        # Read LLM replies as they are generated and stop at the first complete JSON object
+        self.stream = stream
+        self.guess_seconds = []
 
     def get_words(self):
-        # Fetch for 5-letter words and return them in a list
-        try:
-            response = requests.get(
-                'https://raw.githubusercontent.com/tabatkins/wordle-list/main/words'
-            )
-
-            words = [line.strip() for line in response.text.splitlines()]
-
-            self.words = words
-        except Exception as e:
-            print(f"Failed to fetch words: {e}")
+        # The word list is cached on disk and shared by every game of this process
+        self.words = load_words()
 
     def chose_word(self):
         if not self.words:
@@ -62,15 +89,35 @@ class WordleGame(object):
 
         self.evaluations = [[] for _ in range(self.max_tries)]
 
-        self.letters_not_in_word = []
+        self.knowledge = WordleKnowledge()
+        # Same list object as knowledge.absent, kept up to date by update_turn
+        self.letters_not_in_word = self.knowledge.absent
+        # Bitset of the words still consistent with the feedback
+        self.index = load_word_index(self.words)
+        self.candidates = self.index.all
+        self.candidate_count = len(self.words)
+        self.prompts = PromptBuilder(self.prompt_budget)
         self.tries = 0
 
         self.previous_words = []
+        # Seconds spent waiting for each LLM reply
+        self.guess_seconds = []
 
     @staticmethod
     def is_valid_guess(guess: str) -> bool:
         """Check if the guess is valid (5 letters and in word list)."""
-        return len(guess) == 5
+        # The shared word list, the same object as self.words
+        return len(guess) == 5 and guess.lower() in load_words()
+
+    def check_guess(self, guess: str) -> Optional[str]:
+        """Why `guess` would be rejected, None if it can be played"""
+        if len(guess) != 5 or not guess.isalpha():
+            return "is not a 5-letter word"
+        if guess.lower() not in self.words:
+            return "is not in the word list"
+        if self.hard_mode and not self.index.contains(self.candidates, guess):
+            return "contradicts the feedback of previous guesses"
+        return None
 
     def evaluate_guess(self, guess: str, update_score = True) -> List[str]:
         """
@@ -79,71 +126,137 @@ class WordleGame(object):
         '*' - correct letter in wrong position (yellow) (-5 points)
         '#' - letter not in word (gray) (-20 points)
         """
-        result = ['#'] * 5  # Initialize with '#' instead of 'X'
-        target_chars = list(self.target_word)
-        guess_chars = list(guess)
+        return score_pattern(guess, self.target_word)
 
-        # First check for correct positions
-        for i in range(5):
-            if guess_chars[i] == target_chars[i]:
-                result[i] = '+'
-                target_chars[i] = '*'
-                guess_chars[i] = '#'
+    def ask_agent(self, prompt: str) -> str:
+        """
+        Get the next guess from the agent. Agents with a next_guess(game) method (like the local
+        EntropySolver) read the game state directly, anything else is treated as an LLM agent
+        """
+        if hasattr(self.agent, 'next_guess'):
+            return self.agent.next_guess(self)
 
-        # Then check for correct letters in wrong positions
-        for i in range(5):
-            if guess_chars[i] != '#':  # Skip already matched letters
-                if guess_chars[i] in target_chars:  # Check if letter exists in remaining target chars
-                    for j in range(5):
-                        if target_chars[j] != '*' and guess_chars[i] == target_chars[j]:
-                            result[i] = '*'
-                            target_chars[j] = '*'
-                            break
-                # No need for else case as result[i] is already '#'
-
-        # Update letters_not_in_word list
-        for i, result_char in enumerate(result):
-            if result_char == '#' and guess_chars[i] not in self.letters_not_in_word:
-                self.letters_not_in_word.append(guess[i])
-
-        return result
+        request = prompt
+        for _ in range(self.max_retries + 1):
+            start = time.perf_counter()
+            content = self.read_reply(request)
+            self.guess_seconds.append(time.perf_counter() - start)
+            guess, request = self.review_reply(prompt, content)
+            if request is None:
+                return guess
 
-    def play_turn(self):
-        prompt = f"""# Current board state
-{self.pretty_board()}
+        return self.fallback_guess(guess)
 
-# Previous words
-{self.previous_words}
+    async def ask_agent_async(self, prompt: str, call) -> str:
+        """
+        ask_agent for games played concurrently: the agent calls are awaited through `call(agent,
+        prompt)`, such as a utils.arena.AgentCaller
+        """
+        if hasattr(self.agent, 'next_guess'):
+            return self.agent.next_guess(self)
 
-# Previous evaluations
-```python {self.evaluations_to_dict()}```
+        request = prompt
+        for _ in range(self.max_retries + 1):
+            agent_response = await call(self.agent, request)
+            guess, request = self.review_reply(prompt, agent_response.content)
+            if request is None:
+                return guess
 
-"""
-        if self.get_discovered_word_state() != '$$$$$':
-            prompt += f"HIDDEN_WORD_PATTERN={self.get_discovered_word_state()}"
+        return self.fallback_guess(guess)
 
-        if self.letters_not_in_word:
-            prompt += f"""# AVOID THE FOLLOWING LETTERS
-The following letters are not in the word. DO NOT SUGGEST WORDS CONTAINING THESE LETTERS
-The letters not in the target word are: [{','.join(self.letters_not_in_word)}]
-"""
-        agent_response = self.agent.run(prompt)
+    def read_reply(self, request: str) -> str:
+        """
+        The agent's reply to `request`. When streaming, it is read only up to the first complete
+        JSON object and the rest of the generation is cancelled by closing the stream.
+        """
+        if not self.stream:
+            return self.agent.run(request).content
 
-        if self.debug: print("Agent response:", agent_response.content)
-        json_response = extract_json(agent_response.content)
+        parser = JSONStream()
+        text = []
+        chunks = self.agent.run(request, stream=True)
+        try:
+            for chunk in chunks:
+                content = getattr(chunk, 'content', chunk) or ''
+                text.append(content)
+                found = parser.feed(content)
+                if found:
+                    return json.dumps(found[0])
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+        return ''.join(text)
+
+    def review_reply(self, prompt: str, content: str):
+        """The guess in an agent reply, and the request to send back if it is rejected (None if accepted)"""
+        if self.debug: print("Agent response:", content)
+        try:
+            guess = self.parse_guess(content)
+        except (AttributeError, TypeError):
+            guess = ''
+        reason = self.check_guess(guess)
+        if reason is None:
+            return guess, None
+
+        if self.debug: print(f"Rejected guess {guess!r}: {reason}")
+        return guess, f"""{prompt}
+
+# REJECTED GUESS
+Your guess '{guess}' {reason}. Suggest a different word."""
+
+    def fallback_guess(self, guess: str) -> str:
+        # Out of retries: play a word that fits the feedback rather than waste the try
+        return self.index.to_words(self.candidates, limit=1)[0] if self.candidates else guess
+
+    @staticmethod
+    def parse_guess(content: str) -> str:
+        json_response = extract_json(content)
 
         if 'guess' in json_response:
             if isinstance(json_response['guess'], str):
-                guess_word = json_response['guess']
+                guess = json_response['guess']
             else:
-                guess_word = ''.join(list(json_response['guess'].values()))
+                guess = ''.join(list(json_response['guess'].values()))
         else:
-            guess_word = ''.join(list(json_response.values()))
+            guess = ''.join(list(json_response.values()))
+        return guess.strip().lower()
+
+    def build_prompt(self, notes: str = None) -> str:
+        """
+        Prompt for the next guess within the token budget. The state is encoded compactly (one
+        'guess:pattern' per turn and the constraint summary) instead of the conversation so far.
+        When over budget, the example candidates go first, then `notes`, then the candidate count.
+        """
+        self.prompts.add(f'Guess {self.tries + 1} of {self.max_tries}. Reply with JSON {{"guess": "<5-letter word>"}}')
+        if self.previous_words:
+            feedback = ' '.join(f"{word}:{pattern}" for word, pattern in self.evaluations_to_dict().items())
+            self.prompts.add(f"Feedback so far (guess:pattern, + right place, * wrong place, # not in word): {feedback}")
+            self.prompts.add(self.knowledge.summary(), priority=4)
+            self.prompts.add(f"{self.candidate_count} words of the word list still match all the feedback", priority=3)
+            self.prompts.add(f"Some of them: {', '.join(self.index.to_words(self.candidates, limit=20))}", priority=1)
+        self.prompts.add(notes, priority=2)
+        prompt = self.prompts.build()
+        if self.debug: print(f"Prompt: {self.prompts.last_size} tokens (budget {self.prompts.budget})")
+        return prompt
+
+    def play_turn(self):
+        if hasattr(self.agent, 'next_guess'):
+            # No prompt needed for local solvers
+            return self.update_turn(self.agent.next_guess(self))
+
+        guess_word = self.ask_agent(self.build_prompt())
 
         is_correct = self.update_turn(guess_word)
 
         return is_correct
 
+    async def play_turn_async(self, call):
+        if hasattr(self.agent, 'next_guess'):
+            return self.update_turn(self.agent.next_guess(self))
+
+        return self.update_turn(await self.ask_agent_async(self.build_prompt(), call))
+
     def update_turn(self, guess: str) -> bool:
         """
         Play a single turn of Wordle. Returns updated board and whether the guess was correct.
@@ -157,6 +270,9 @@ The letters not in the target word are: [{','.join(self.letters_not_in_word)}]
 
         # Add to evaluations
         self.evaluations[self.tries] = result
+        self.knowledge.update(guess, result)
+        self.candidates = self.index.candidates(self.knowledge)
+        self.candidate_count = popcount(self.candidates)
 
         self.previous_words.append(guess)
 
@@ -194,15 +310,7 @@ The letters not in the target word are: [{','.join(self.letters_not_in_word)}]
         return out
 
     def evaluations_to_dict(self):
-        if len(self.previous_words) == 0:
-            return {}
-
-        output = {}
-        for word in self.previous_words:
-            result = self.evaluate_guess(word, False)
-            output[word] = ''.join(result)
-
-        return output
+        return self.knowledge.feedback
 
     def is_over(self):
         return self.tries == self.max_tries and '$' not in self.get_discovered_word_state()
@@ -240,20 +348,9 @@ The letters not in the target word are: [{','.join(self.letters_not_in_word)}]
     def get_discovered_word_state(self):
         """Returns the current state of the discovered word, where:
         - Known letters in correct positions are shown
-        - Unknown positions are shown as '*'
+        - Unknown positions are shown as '$'
         """
-        if not self.previous_words:  # If no guesses made yet
-            return '$$$$$'
-            
-        result = ['$'] * 5
-        
-        # Check all previous guesses to find correct letters
-        for guess, eval_str in zip(self.previous_words, self.evaluations):
-            for i, (letter, eval_char) in enumerate(zip(guess, eval_str)):
-                if eval_char == '+':  # Correct letter in correct position
-                    result[i] = letter
-                    
-        return ''.join(result)
+        return self.knowledge.discovered
 
     def display_details(self):
         details = [
@@ -261,7 +358,8 @@ The letters not in the target word are: [{','.join(self.letters_not_in_word)}]
             f"[cyan]State of hidden word:[/] [yellow]{self.get_discovered_word_state()}[/]",
             f"[cyan]Previous words:[/] [yellow]{','.join(self.previous_words)}[/]",
             f"[cyan]Previous evaluations:[/] [yellow]{self.evaluations_to_dict()}[/]",
-            f"[cyan]Letters not in hidden word:[/] [yellow]{self.letters_not_in_word}[/]"
+            f"[cyan]Letters not in hidden word:[/] [yellow]{self.letters_not_in_word}[/]",
+            f"[cyan]Remaining candidates:[/] [yellow]{self.candidate_count}[/]"
         ]
         details_str = "\n".join(details)
         rprint(Panel(details_str, title="Game Details"))
@@ -0,0 +1,82 @@
+# Bitset index over the Wordle word list
+#
+# Sets of words are Python ints with bit i standing for word i of the (sorted) WordList. The
+# words consistent with a WordleKnowledge state are then a handful of ANDs of the precomputed
+# per-(position, letter) and per-letter-count sets.
+
+from typing import Dict, List
+
+import numpy as np
+
+from wordle_knowledge import ALL_LETTERS, ALPHABET, WORD_LENGTH, WordleKnowledge
+from wordle_words import WordList
+
+_indexes: Dict[str, 'WordIndex'] = {}
+
+
+def _to_bitset(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+class WordIndex(object):
+    """
+    at[position][letter]:   words with `letter` (0-25) at `position`
+    at_least[letter][count]: words containing `letter` at least `count` times (count 0-5)
+    """
+
+    def __init__(self, words: WordList):
+        self.words = words
+        codes = (np.frombuffer(words.data, dtype=np.uint8) - ord('a')).reshape(-1, WORD_LENGTH)
+        self.all = (1 << len(words)) - 1
+        self.at = [[_to_bitset(codes[:, i] == letter) for letter in range(len(ALPHABET))] for i in range(WORD_LENGTH)]
+        self.at_least = []
+        for letter in range(len(ALPHABET)):
+            counts = (codes == letter).sum(axis=1)
+            self.at_least.append([_to_bitset(counts >= count) for count in range(WORD_LENGTH + 1)])
+
+    def candidates(self, knowledge: WordleKnowledge) -> int:
+        """Set of the words consistent with all the feedback in `knowledge`"""
+        bits = self.all
+        for i, allowed in enumerate(knowledge.allowed):
+            if allowed == ALL_LETTERS:
+                continue
+            letters = [letter for letter in range(len(ALPHABET)) if allowed >> letter & 1]
+            if len(letters) <= len(ALPHABET) // 2:
+                position = 0
+                for letter in letters:
+                    position |= self.at[i][letter]
+                bits &= position
+            else:
+                for letter in range(len(ALPHABET)):
+                    if not allowed >> letter & 1:
+                        bits &= ~self.at[i][letter]
+        for letter in range(len(ALPHABET)):
+            if knowledge.min_counts[letter]:
+                bits &= self.at_least[letter][knowledge.min_counts[letter]]
+            if knowledge.max_counts[letter] < WORD_LENGTH:
+                bits &= ~self.at_least[letter][knowledge.max_counts[letter] + 1]
+        return bits
+
+    def contains(self, bits: int, word: str) -> bool:
+        index = self.words.index(word)
+        return index >= 0 and bool(bits >> index & 1)
+
+    def to_words(self, bits: int, limit: int = None) -> List[str]:
+        words = []
+        while bits and (limit is None or len(words) < limit):
+            lowest = bits & -bits
+            words.append(self.words[lowest.bit_length() - 1])
+            bits ^= lowest
+        return words
+
+
+def load_word_index(words: WordList) -> WordIndex:
+    """Index of `words`, built once per process"""
+    index = _indexes.get(words.digest)
+    if index is None:
+        index = _indexes[words.digest] = WordIndex(words)
+    return index
@@ -0,0 +1,108 @@
+# Everything the feedback so far says about the hidden word
+#
+# Updated once per turn from the evaluated guess, so the game, prompts and candidate filters can
+# read the constraints without replaying the previous guesses. Letters are bits of a 26 bit mask
+# (a = bit 0 ... z = bit 25).
+
+from typing import Dict, List, Sequence
+
+WORD_LENGTH = 5
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+ALL_LETTERS = (1 << len(ALPHABET)) - 1
+
+
+def letter_bit(letter: str) -> int:
+    """Mask bit of a letter, 0 for anything outside a-z"""
+    return 1 << (ord(letter) - ord('a')) if letter in ALPHABET else 0
+
+
+class WordleKnowledge(object):
+    """
+    allowed:    per position, mask of the letters that can still be there
+    min_counts: per letter, how many times it is known to appear at least
+    max_counts: per letter, how many times it can appear at most (a '#' pins it to the non-'#' copies)
+    greens:     per position, the confirmed letter or None
+    yellows:    letters known to be in the word whose position is not confirmed yet
+    absent:     letters known not to be in the word, in the order they were found
+    feedback:   guess -> feedback string ('+*#'), in the order of the guesses
+    """
+
+    def __init__(self):
+        self.allowed = [ALL_LETTERS] * WORD_LENGTH
+        self.min_counts = [0] * len(ALPHABET)
+        self.max_counts = [WORD_LENGTH] * len(ALPHABET)
+        self.greens: List[str] = [None] * WORD_LENGTH
+        self.yellows: List[str] = []
+        self.absent: List[str] = []
+        self.feedback: Dict[str, str] = {}
+        self.discovered = '$' * WORD_LENGTH
+
+    def update(self, guess: str, result: Sequence[str]):
+        guess = guess.lower()
+        present = {}
+        grays = set()
+        for i, (letter, symbol) in enumerate(zip(guess, result)):
+            bit = letter_bit(letter)
+            if symbol == '+':
+                self.allowed[i] = bit
+                self.greens[i] = letter
+            else:
+                self.allowed[i] &= ~bit
+            if symbol == '#':
+                grays.add(letter)
+            else:
+                present[letter] = present.get(letter, 0) + 1
+
+        for letter in set(guess) & set(ALPHABET):
+            index = ord(letter) - ord('a')
+            copies = present.get(letter, 0)
+            self.min_counts[index] = max(self.min_counts[index], copies)
+            if letter in grays:
+                self.max_counts[index] = min(self.max_counts[index], copies)
+                if copies == 0 and letter not in self.absent:
+                    self.absent.append(letter)
+                    self.allowed = [mask & ~letter_bit(letter) for mask in self.allowed]
+
+        self.yellows = [
+            letter for letter in ALPHABET
+            if self.min_counts[ord(letter) - ord('a')] > self.greens.count(letter)
+        ]
+        self.feedback[guess] = ''.join(result)
+        self.discovered = ''.join(letter or '$' for letter in self.greens)
+
+    def matches(self, word: str) -> bool:
+        """Whether `word` could still be the hidden word"""
+        word = word.lower()
+        if len(word) != WORD_LENGTH or not all(self.allowed[i] & letter_bit(letter) for i, letter in enumerate(word)):
+            return False
+        for index, letter in enumerate(ALPHABET):
+            if not self.min_counts[index] <= word.count(letter) <= self.max_counts[index]:
+                return False
+        return True
+
+    def summary(self) -> str:
+        """Compact, deterministic description of the constraints, one fact per line"""
+        if not self.feedback:
+            return "No feedback yet"
+        lines = [f"Pattern: {''.join(letter or '_' for letter in self.greens)}"]
+        if self.yellows:
+            yellows = []
+            for letter in self.yellows:
+                excluded = [
+                    str(i + 1) for i in range(WORD_LENGTH)
+                    if self.greens[i] is None and not self.allowed[i] & letter_bit(letter)
+                ]
+                yellows.append(f"{letter} (not at {','.join(excluded)})" if excluded else letter)
+            lines.append(f"In the word, position unknown: {', '.join(yellows)}")
+        if self.absent:
+            lines.append(f"Not in the word: {', '.join(sorted(self.absent))}")
+        counts = []
+        for index, letter in enumerate(ALPHABET):
+            low, high = self.min_counts[index], self.max_counts[index]
+            if low and high == low:
+                counts.append(f"{letter} exactly {low}x")
+            elif low > 1:
+                counts.append(f"{letter} at least {low}x")
+        if counts:
+            lines.append(f"Letter counts: {', '.join(counts)}")
+        return '\n'.join(lines)
@@ -0,0 +1,257 @@
+# Precomputed Wordle feedback patterns
+#
+# The feedback for a guess against an answer is packed into one base-3 digit per position
+# (0 = '#', 1 = '*', 2 = '+', position 0 is the least significant digit), so every pattern fits
+# a uint8 in 0..242 and 242 means five greens. The full guess x answer matrix of the word list is
+# built with NumPy, saved next to the word list cache as patterns-<word list digest>.npy and
+# memory-mapped on later runs. A copy stored by answer (patterns-<digest>-by-answer.npy) is made
+# the first time it is asked for: there the patterns of a few candidate answers against every
+# guess are a few contiguous rows instead of a byte from every row.
+#
+# Usage:
+#   python wordle/wordle_patterns.py build      # build (or load) the matrix of the cached word list
+#   python wordle/wordle_patterns.py bench      # compare score_patterns with the scalar loop
+#
+# score_pattern is the plain-Python loop for a single guess and answer, which is what a game needs
+# each turn; score_patterns scores whole arrays at once and only pays off for batches.
+
+import argparse
+import os
+import random
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from wordle_words import CACHE_DIR, WORD_LENGTH, WordList, load_words
+
+SYMBOLS = '#*+'
+PATTERN_COUNT = 3 ** WORD_LENGTH
+ALL_GREEN = PATTERN_COUNT - 1
+WEIGHTS = 3 ** np.arange(WORD_LENGTH, dtype=np.uint8)
+
+_matrices: Dict[str, 'PatternMatrix'] = {}
+
+
+def encode_words(words) -> np.ndarray:
+    """Letter codes (a = 0 ... z = 25) of a WordList or a sequence of words as an (n, 5) uint8 array"""
+    data = words.data if isinstance(words, WordList) else ''.join(words).lower().encode('ascii')
+    return (np.frombuffer(data, dtype=np.uint8) - ord('a')).reshape(-1, WORD_LENGTH)
+
+
+def encode_word(word: str) -> np.ndarray:
+    """Letter codes of one word as a (5,) uint8 array"""
+    return encode_words([word])[0]
+
+
+def encode_pattern(result: Sequence[str]) -> int:
+    return sum(SYMBOLS.index(symbol) * 3 ** i for i, symbol in enumerate(result))
+
+
+def decode_pattern(code: int) -> List[str]:
+    result = []
+    for _ in range(WORD_LENGTH):
+        code, digit = divmod(int(code), 3)
+        result.append(SYMBOLS[digit])
+    return result
+
+
+def score_patterns(guesses: np.ndarray, answers: np.ndarray) -> np.ndarray:
+    """
+    Pattern codes of letter code arrays of shape (..., 5) that broadcast against each other:
+    (5,) against (n, 5) scores one guess against n answers, (n, 5) against (5,) n guesses against
+    one answer, (n, 1, 5) against (m, 5) gives the full (n, m) matrix. Duplicate letters follow
+    the two-pass rule of WordleGame: greens are matched first, then each remaining guess letter,
+    left to right, takes the first unmatched copy in the answer.
+    """
+    guess = [guesses[..., i] for i in range(WORD_LENGTH)]
+    answer = [answers[..., i] for i in range(WORD_LENGTH)]
+    unmatched = [g != a for g, a in zip(guess, answer)]
+    codes = np.zeros(np.broadcast_shapes(guesses.shape, answers.shape)[:-1], dtype=np.uint8)
+    for i in range(WORD_LENGTH):
+        # A letter is yellow while the answer has more unmatched copies than earlier non-green guesses used up
+        available = np.zeros(codes.shape, dtype=np.uint8)
+        for k in range(WORD_LENGTH):
+            available += (answer[k] == guess[i]) & unmatched[k]
+        for j in range(i):
+            available -= (guess[j] == guess[i]) & unmatched[j] & (available > 0)
+        codes += np.where(unmatched[i], available > 0, 2).astype(np.uint8) * WEIGHTS[i]
+    return codes
+
+
+def score_pattern(guess: str, answer: str) -> List[str]:
+    """
+    Feedback for one guess against one answer, with the scalar two-pass loop. NumPy costs far more
+    than the loop itself for a single pair, so this is the path for WordleGame.evaluate_guess.
+    """
+    result = ['#'] * WORD_LENGTH
+    answer_chars = list(answer.lower())
+    guess_chars = list(guess.lower())
+    for i in range(WORD_LENGTH):
+        if guess_chars[i] == answer_chars[i]:
+            result[i] = '+'
+            answer_chars[i] = '*'
+            guess_chars[i] = '#'
+    for i in range(WORD_LENGTH):
+        if guess_chars[i] != '#' and guess_chars[i] in answer_chars:
+            for j in range(WORD_LENGTH):
+                if answer_chars[j] != '*' and guess_chars[i] == answer_chars[j]:
+                    result[i] = '*'
+                    answer_chars[j] = '*'
+                    break
+    return result
+
+
+def build_pattern_matrix(guesses: np.ndarray, answers: np.ndarray, chunk_size: int = 32) -> np.ndarray:
+    """(len(guesses), len(answers)) uint8 matrix of pattern codes, built a block of guess rows at a time"""
+    matrix = np.empty((len(guesses), len(answers)), dtype=np.uint8)
+    answers = answers[np.newaxis, :, :]
+    for start in range(0, len(guesses), chunk_size):
+        block = guesses[start:start + chunk_size, np.newaxis, :]
+        matrix[start:start + chunk_size] = score_patterns(block, answers)
+    return matrix
+
+
+class PatternMatrix(object):
+    """Feedback pattern of every word of a word list (as a guess) against every word (as the answer)"""
+
+    def __init__(self, words: WordList, matrix: np.ndarray, path: str = None):
+        self.words = words
+        self.matrix = matrix
+        # The .npy file of `matrix`, if it has one; the answer-major copy is saved next to it
+        self.path = path
+        self._by_answer = None
+
+    @property
+    def by_answer(self) -> np.ndarray:
+        """The matrix transposed: row `a` holds the pattern of every guess against answer `a`"""
+        if self._by_answer is None:
+            if self.path is None:
+                self._by_answer = np.ascontiguousarray(self.matrix.T)
+            else:
+                self._by_answer = _load_transposed(self.matrix, self.path.replace('.npy', '-by-answer.npy'))
+        return self._by_answer
+
+    def code(self, guess: str, answer: str) -> int:
+        guess_index, answer_index = self.words.index(guess), self.words.index(answer)
+        if guess_index < 0 or answer_index < 0:
+            missing = guess if guess_index < 0 else answer
+            raise KeyError(f"{missing!r} is not in the word list")
+        return int(self.matrix[guess_index, answer_index])
+
+    def pattern(self, guess: str, answer: str) -> List[str]:
+        """Same result as WordleGame.evaluate_guess: a list of '+', '*' and '#'"""
+        return decode_pattern(self.code(guess, answer))
+
+
+def _load_transposed(matrix: np.ndarray, path: str, chunk_size: int = 512) -> np.ndarray:
+    """Memory-mapped transpose of `matrix` from `path`, written first (a block of rows at a time) when missing"""
+    if not os.path.exists(path):
+        temporary = f"{path}.{os.getpid()}.tmp.npy"
+        transposed = np.lib.format.open_memmap(temporary, mode='w+', dtype=np.uint8, shape=matrix.shape[::-1])
+        for start in range(0, matrix.shape[1], chunk_size):
+            transposed[start:start + chunk_size] = matrix[:, start:start + chunk_size].T
+        transposed.flush()
+        del transposed
+        os.replace(temporary, path)
+    return np.load(path, mmap_mode='r')
+
+
+def pattern_file(words: WordList) -> str:
+    return os.path.join(CACHE_DIR, f"patterns-{words.digest}.npy")
+
+
+def load_pattern_matrix(words: WordList = None) -> PatternMatrix:
+    """
+    Pattern matrix of `words` (the cached word list by default). Loaded once per process from the
+    memory-mapped .npy file, which is built first when missing.
+    """
+    words = load_words() if words is None else words
+    matrix = _matrices.get(words.digest)
+    if matrix is None:
+        path = pattern_file(words)
+        if not os.path.exists(path):
+            codes = encode_words(words)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(temporary, build_pattern_matrix(codes, codes))
+            os.replace(temporary, path)
+        matrix = _matrices[words.digest] = PatternMatrix(words, np.load(path, mmap_mode='r'), path)
+    return matrix
+
+
+def bench(pairs: int = 20_000, seed: int = 0):
+    """Time the scalar loop against score_patterns one pair at a time and in batches, and check they agree"""
+    words = list(load_words())
+    rng = random.Random(seed)
+    guesses = [rng.choice(words) for _ in range(pairs)]
+    answers = [rng.choice(words) for _ in range(pairs)]
+    guess_codes, answer_codes = encode_words(guesses), encode_words(answers)
+    all_codes = encode_words(words)
+
+    rows = []
+    start = time.perf_counter()
+    expected = [encode_pattern(score_pattern(guess, answer)) for guess, answer in zip(guesses, answers)]
+    rows.append(('score_pattern, one pair per call', pairs, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    single = [int(score_patterns(guess, answer)) for guess, answer in zip(guess_codes[:2000], answer_codes[:2000])]
+    rows.append(('score_patterns, one pair per call', len(single), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    paired = score_patterns(guess_codes, answer_codes)
+    rows.append(('score_patterns, pairs as one batch', pairs, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    one_guess = score_patterns(guess_codes[0], all_codes)
+    rows.append(('score_patterns, one guess x all answers', len(words), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    one_answer = score_patterns(all_codes, answer_codes[0])
+    rows.append(('score_patterns, all guesses x one answer', len(words), time.perf_counter() - start))
+
+    mismatches = int((paired != np.array(expected, dtype=np.uint8)).sum())
+    mismatches += sum(code != value for code, value in zip(single, expected))
+    mismatches += sum(int(one_guess[i]) != encode_pattern(score_pattern(guesses[0], word)) for i, word in enumerate(words))
+    mismatches += sum(int(one_answer[i]) != encode_pattern(score_pattern(word, answers[0])) for i, word in enumerate(words))
+
+    print(f"{'method':<42} {'pairs':>8} {'seconds':>9} {'pairs/s':>12}")
+    for name, count, seconds in rows:
+        print(f"{name:<42} {count:>8} {seconds:>9.4f} {count / max(seconds, 1e-9):>12.0f}")
+    print(f"{mismatches} mismatches against the scalar loop")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wordle feedback pattern matrix and scoring benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="build or load the guess x answer pattern matrix")
+    build_parser.add_argument("--rebuild", action="store_true", help="discard the cached matrix first")
+
+    bench_parser = commands.add_parser("bench", help="compare score_patterns with the scalar loop")
+    bench_parser.add_argument("--pairs", type=int, default=20_000)
+    bench_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        raise SystemExit(1 if bench(args.pairs, args.seed) else 0)
+
+    words = load_words()
+    path = pattern_file(words)
+    if args.rebuild:
+        for stale in (path, path.replace('.npy', '-by-answer.npy')):
+            if os.path.exists(stale):
+                os.remove(stale)
+    cached = os.path.exists(path)
+
+    start = time.perf_counter()
+    patterns = load_pattern_matrix(words)
+    seconds = time.perf_counter() - start
+    print(f"{'Loaded' if cached else 'Built'} {patterns.matrix.shape[0]}x{patterns.matrix.shape[1]} pattern matrix "
+          f"in {seconds:.2f}s ({path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# Headless batch runner for Wordle guessing strategies
+#
+# Plays WordleGame against every word of the list (or a random sample) with one of the guesser
+# backends below, spread over a process pool. Nothing is rendered: games are driven through
+# play_turn() with debug off. Reports the win rate, the distribution of guesses, the hardest
+# words and the throughput, and can write one JSON record per game.
+#
+# LLM-backed players spend their time waiting on the model, so with --concurrency they are played
+# as asyncio games in one process instead (see utils/arena.py). The stand-in player is a local
+# model with a simulated latency for measuring that throughput offline. With --cache, repeated
+# agent requests are answered from the LLM response cache (utils/llm_cache.py). With --stream,
+# LLM replies are read as they are generated and the guess is taken as soon as its JSON object is
+# complete; the report shows how long each guess took to arrive either way.
+#
+# Usage (from the repository root, with it on PYTHONPATH):
+#   python wordle/wordle_simulate.py [--player solver] [--sample 500] [--workers 4] [--jsonl games.jsonl]
+#   python wordle/wordle_simulate.py --player stand-in --sample 200 --concurrency 32 [--latency-ms 300]
+#   python wordle/wordle_simulate.py --player stand-in --sample 20 --workers 1 --stream [--token-ms 20]
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils import backends, llm_cache
+from utils.arena import AgentCaller, StandInModel, fork, run_matches
+from wordle_game import WordleGame, stand_in_guess
+from wordle_words import load_words
+
+
+def _llm_player():
+    # Importing wordle builds the DeepSeek agents, so only do it when they are asked for
+    from wordle import guess_agent
+    return guess_agent
+
+
+def _solver(**options):
+    def create():
+        from wordle_solver import EntropySolver
+        solver = EntropySolver(**options)
+        solver.warm_up()
+        return solver
+    return create
+
+
+def _stand_in(latency: float = 0.3, jitter: float = 0.1, capacity: int = None, token_delay: float = 0.02):
+    def create():
+        return StandInModel(stand_in_guess, latency, jitter, capacity, token_delay=token_delay)
+    return create
+
+
+PLAYERS = {
+    'solver': _solver(),
+    'solver-turns': _solver(strategy='turns'),
+    'solver-hard': _solver(hard_mode=True),
+    'llm': _llm_player,
+    'stand-in': _stand_in(),
+}
+
+def create_player(player: str, options: Optional[argparse.Namespace] = None):
+    """
+    A new `player` of PLAYERS. `options` are the backends.add_arguments options and --capacity:
+    with them the LLM player answers from the chosen backend and the stand-in takes its latency,
+    time per word and capacity from them.
+    """
+    if options is None:
+        return PLAYERS[player]()
+    if player == 'stand-in':
+        latency = options.latency_ms / 1e3
+        return _stand_in(latency, latency / 3, options.capacity, options.token_ms / 1e3)()
+    return backends.backend(PLAYERS[player](), options, stand_in_guess)
+
+
+# The players of this process (with their response cache) by their options, created on first use
+_players: Dict[str, tuple] = {}
+
+
+def _worker_player(player: str, cache: Optional[dict], options: Optional[argparse.Namespace]):
+    """The player and response cache for these options, shared by the chunks this process plays"""
+    key = repr((player, sorted(cache.items()) if cache else None, sorted(vars(options).items()) if options else None))
+    if key not in _players:
+        response_cache = llm_cache.ResponseCache(**cache) if cache is not None else None
+        _players[key] = llm_cache.cached(create_player(player, options), response_cache), response_cache
+    return _players[key]
+
+
+def _record(game: WordleGame, target: str, won: bool, error: str, start: float) -> dict:
+    """Record of a game against `target` started at perf_counter() `start`, as written to --jsonl"""
+    return {
+        'target': target,
+        'won': won,
+        'guesses': game.tries,
+        'words': game.previous_words,
+        'feedback': [''.join(result) for result in game.evaluations[:game.tries]],
+        'candidates_left': game.candidate_count,
+        'error': error,
+        'seconds': round(time.perf_counter() - start, 6),
+        'guess_seconds': [round(seconds, 6) for seconds in game.guess_seconds],
+    }
+
+
+def _start(game: WordleGame, target: str) -> float:
+    """Set up `game` against `target`; the returned start time counts the setup"""
+    start = time.perf_counter()
+    game.init()
+    game.target_word = target
+    return start
+
+
+def play_game(game: WordleGame, target: str) -> dict:
+    """Play one full game against `target` and return its record"""
+    start = _start(game, target)
+    won, error = False, None
+    try:
+        while game.tries < game.max_tries and not won:
+            won = game.play_turn()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return _record(game, target, won, error, start)
+
+
+async def play_game_async(game: WordleGame, target: str, call) -> dict:
+    """play_game with the agent calls awaited through `call`"""
+    start = _start(game, target)
+    won, error = False, None
+    try:
+        while game.tries < game.max_tries and not won:
+            won = await game.play_turn_async(call)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return _record(game, target, won, error, start)
+
+
+def _simulate_task(player: str, targets: List[str], max_tries: int, hard_mode: bool, cache: Optional[dict] = None,
+                   stream: bool = False, options: Optional[argparse.Namespace] = None) -> Tuple[List[dict], Dict[str, int]]:
+    """The records of the games against `targets` and the cache lookups they made"""
+    agent, response_cache = _worker_player(player, cache, options)
+    before = response_cache.counters() if response_cache is not None else {}
+    game = WordleGame(agent=agent, max_tries=max_tries, hard_mode=hard_mode, stream=stream)
+    records = [play_game(game, target) for target in targets]
+    after = response_cache.counters() if response_cache is not None else {}
+    return records, {name: after[name] - before[name] for name in after}
+
+
+def simulate(player: str, targets: List[str], workers: int = 1, max_tries: int = 6, hard_mode: bool = False,
+             chunk_size: int = 50, cache: Optional[dict] = None, stream: bool = False,
+             options: Optional[argparse.Namespace] = None) -> List[dict]:
+    """
+    Records of one game per target, in the order of `targets`. `cache` holds the ResponseCache
+    arguments (llm_cache.settings) to answer LLM players from the response cache, `stream` reads
+    their replies only up to the guess, `options` picks their backend (see create_player)
+    """
+    chunks = [targets[start:start + chunk_size] for start in range(0, len(targets), chunk_size)]
+    if workers <= 1:
+        results = [_simulate_task(player, chunk, max_tries, hard_mode, cache, stream, options) for chunk in chunks]
+    else:
+        if player.startswith('solver'):
+            # Compute the cached opening book once instead of in every worker
+            PLAYERS[player]()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_simulate_task, player, chunk, max_tries, hard_mode, cache, stream, options)
+                       for chunk in chunks]
+            results = [future.result() for future in futures]
+
+    if cache is not None:
+        # The lookups of every worker, against the file they share
+        total = llm_cache.ResponseCache(**cache)
+        for _, counters in results:
+            total.add_counters(counters)
+        print(total.report())
+    return [record for records, _ in results for record in records]
+
+
+def simulate_async(player, targets: List[str], concurrency: int = 8, timeout: float = None, max_tries: int = 6,
+                   hard_mode: bool = False) -> List[dict]:
+    """
+    Records of one game per target, all played at once on an event loop with at most `concurrency`
+    agent calls in flight. Games that time out are recorded as lost with the error.
+    """
+    async def run():
+        caller = AgentCaller(concurrency)
+        games = [WordleGame(agent=fork(player), max_tries=max_tries, hard_mode=hard_mode) for _ in targets]
+        for game, target in zip(games, targets):
+            # A game that times out before its first turn still has a board to record
+            _start(game, target)
+
+        async def play(game: int):
+            record = await play_game_async(games[game], targets[game], caller)
+            return record, record['guesses']
+
+        matches = await run_matches(play, len(targets), timeout)
+        print(f"{caller.calls} agent calls, {caller.rate_limited} rate limited, {caller.waited:.1f}s of backoff")
+        # A timed-out game is recorded as lost with the turns it played
+        return [match.result or _record(games[match.game], targets[match.game], False, match.error,
+                                        time.perf_counter() - match.seconds) for match in matches]
+
+    return asyncio.run(run())
+
+
+def report(records: List[dict], seconds: float, max_tries: int, worst: int = 10):
+    games = len(records)
+    wins = [record for record in records if record['won']]
+    distribution = Counter(record['guesses'] for record in wins)
+    errors = sum(1 for record in records if record['error'])
+
+    print(f"{games} games in {seconds:.2f}s: {games / max(seconds, 1e-9):.1f} games/s")
+    print(f"win rate {len(wins) / max(games, 1):.2%} ({len(wins)}/{games}), {errors} errors")
+    if wins:
+        print(f"average guesses when won: {sum(record['guesses'] for record in wins) / len(wins):.3f}")
+    for guesses in range(1, max_tries + 1):
+        count = distribution[guesses]
+        print(f"  {guesses}: {count:>6} {'#' * round(50 * count / max(games, 1))}")
+    print(f"  X: {games - len(wins):>6}")
+    waits = sorted(seconds for record in records for seconds in record.get('guess_seconds', []))
+    if waits:
+        print(f"time to guess: median {waits[len(waits) // 2] * 1e3:.0f} ms, "
+              f"p90 {waits[int(len(waits) * 0.9)] * 1e3:.0f} ms over {len(waits)} agent replies")
+
+    hardest = sorted(records, key=lambda record: (record['won'], -record['guesses'], -record['candidates_left']))
+    print("hardest words:")
+    for record in hardest[:worst]:
+        outcome = f"{record['guesses']} guesses" if record['won'] else f"lost ({record['candidates_left']} left)"
+        print(f"  {record['target']}: {outcome} {' '.join(record['words'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Wordle games over the word list")
+    parser.add_argument("--player", choices=sorted(PLAYERS), default="solver", help="guesser backend")
+    parser.add_argument("--sample", type=int, help="play N random targets instead of the whole list")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --sample")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes")
+    parser.add_argument("--max-tries", type=int, default=6)
+    parser.add_argument("--hard-mode", action="store_true", help="reject guesses that contradict the feedback")
+    parser.add_argument("--worst", type=int, default=10, help="number of hardest words to list")
+    parser.add_argument("--jsonl", help="write one JSON record per game to this file")
+    parser.add_argument("--concurrency", type=int,
+                        help="play all games at once on an event loop with this many agent calls in flight "
+                             "(llm and stand-in players)")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per game with --concurrency")
+    parser.add_argument("--capacity", type=int, help="stand-in rate limit: max requests in flight")
+    parser.add_argument("--stream", action="store_true",
+                        help="read LLM replies as they stream and stop at the guess (without --concurrency)")
+    backends.add_arguments(parser, seed=False)
+    llm_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    targets = list(load_words())
+    if args.sample:
+        targets = random.Random(args.seed).sample(targets, min(args.sample, len(targets)))
+
+    start = time.perf_counter()
+    if args.concurrency:
+        player = create_player(args.player, args)
+        cache = llm_cache.from_args(args)
+        records = simulate_async(llm_cache.cached(player, cache), targets, args.concurrency, args.timeout,
+                                 args.max_tries, args.hard_mode)
+        if cache is not None:
+            print(cache.report())
+    else:
+        records = simulate(args.player, targets, args.workers, args.max_tries, args.hard_mode,
+                           cache=llm_cache.settings(args), stream=args.stream, options=args)
+    seconds = time.perf_counter() - start
+
+    if args.jsonl:
+        with open(args.jsonl, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+    report(records, seconds, args.max_tries, args.worst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# Local Wordle solver built on the precomputed feedback pattern matrix
+#
+# The solver keeps the indices of the answers that are still consistent with the feedback and
+# scores every word of the list as the next guess by how it splits them into feedback patterns.
+# It can be used wherever WordleGame takes an agent: WordleGame asks any agent with a
+# next_guess(game) method for its guess directly instead of prompting it.
+
+import json
+import os
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from wordle_patterns import (
+    PATTERN_COUNT, PatternMatrix, encode_pattern, encode_word, encode_words, load_pattern_matrix, score_patterns,
+)
+from wordle_words import CACHE_DIR
+
+STRATEGIES = ('entropy', 'turns')
+# Rough number of extra guesses needed per bit of uncertainty left after a guess
+TURNS_PER_BIT = 0.25
+# Guess rows of the pattern matrix scored at a time, so the bucket counts never need a full copy of it
+SCORE_BLOCK = 256
+
+_books: Dict[Tuple[str, str], Dict[str, str]] = {}
+
+
+class EntropySolver(object):
+    """
+    Guesses the word that maximizes the expected information (entropy) of its feedback over the
+    remaining candidates. With strategy='turns' it minimizes an estimate of the expected number of
+    guesses instead, which favours guessing a candidate when few are left. In hard mode only the
+    remaining candidates are guessed.
+    """
+
+    def __init__(self, patterns: PatternMatrix = None, strategy: str = 'entropy', hard_mode: bool = False):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+        self.patterns = patterns or load_pattern_matrix()
+        self.strategy = strategy
+        self.hard_mode = hard_mode
+        self.memo: Dict[str, str] = {}
+        self.book_name = f"{strategy}-hard" if hard_mode else strategy
+        self.book = _load_book(self.patterns.words.digest, self.book_name)
+        counts = np.arange(len(self.patterns.words) + 1, dtype=np.float64)
+        self.log2 = np.log2(np.maximum(counts, 1))
+        self.xlog2x = counts * self.log2
+        self.offsets = np.arange(SCORE_BLOCK, dtype=np.intp)[:, np.newaxis] * PATTERN_COUNT
+        self.reset()
+
+    def reset(self):
+        self.candidates = np.arange(len(self.patterns.words))
+        self.history: List[Tuple[str, int]] = []
+
+    def update(self, guess: str, result: Sequence[str]):
+        """Keep only the candidates that would have produced `result` for `guess`"""
+        code = encode_pattern(result)
+        index = self.patterns.words.index(guess)
+        if index >= 0:
+            codes = self.patterns.matrix[index, self.candidates]
+        else:
+            codes = score_patterns(encode_word(guess), encode_words(self.patterns.words)[self.candidates])
+        self.candidates = self.candidates[codes == code]
+        self.history.append((guess.lower(), code))
+
+    def remaining(self) -> List[str]:
+        return [self.patterns.words[index] for index in self.candidates]
+
+    def best_guess(self) -> str:
+        key = ' '.join(f"{guess}:{code}" for guess, code in self.history)
+        guess = self.book.get(key) or self.memo.get(key)
+        if guess is None:
+            guess = self._choose()
+            if len(self.history) <= 1:
+                self.book[key] = guess
+                _save_book(self.patterns.words.digest, self.book_name, self.book)
+            else:
+                self.memo[key] = guess
+        return guess
+
+    def _choose(self) -> str:
+        if len(self.candidates) == 0:
+            raise ValueError("No word in the list matches the feedback so far")
+        if len(self.candidates) <= 2:
+            return self.patterns.words[self.candidates[0]]
+        return self.patterns.words[int(np.argmin(self.scores()))]
+
+    def warm_up(self):
+        """
+        Compute the opening and the reply to every feedback pattern of it. Together they cost about
+        as much as the opening alone and are cached on disk, so later guesses only score the few
+        candidates left after two turns.
+        """
+        history, candidates = self.history, self.candidates
+        self.reset()
+        opening = self.best_guess()
+        feedback = self.patterns.matrix[self.patterns.words.index(opening)]
+        for code in np.unique(feedback):
+            key = f"{opening}:{code}"
+            if key not in self.book:
+                self.candidates = np.flatnonzero(feedback == code)
+                self.book[key] = self._choose()
+        _save_book(self.patterns.words.digest, self.book_name, self.book)
+        self.history, self.candidates = history, candidates
+
+    def scores(self) -> np.ndarray:
+        """Score of every word as the next guess, lower is better"""
+        count = len(self.candidates)
+        matrix = self.patterns.matrix
+        if count == matrix.shape[1]:
+            # The opening move: every answer, rows of the guess-major matrix as they are
+            feedback = matrix
+        else:
+            # The few rows of the candidates in the answer-major copy, one row per guess after the transpose
+            feedback = np.ascontiguousarray(self.patterns.by_answer[self.candidates].T)
+        # Sum of n * log2(n) over the pattern buckets of each guess, counted a block of guesses at a time
+        spread = np.empty(len(matrix))
+        indices = np.empty((SCORE_BLOCK, count), dtype=np.intp)
+        for start in range(0, len(matrix), SCORE_BLOCK):
+            block = feedback[start:start + SCORE_BLOCK]
+            rows = len(block)
+            np.add(block, self.offsets[:rows], out=indices[:rows])
+            buckets = np.bincount(indices[:rows].ravel(), minlength=rows * PATTERN_COUNT)
+            if count > PATTERN_COUNT:
+                spread[start:start + rows] = self.xlog2x[buckets].reshape(rows, PATTERN_COUNT).sum(axis=1)
+            else:
+                # Fewer candidates than patterns: each candidate adds log2 of its own bucket size instead
+                spread[start:start + rows] = self.log2[buckets[indices[:rows]]].sum(axis=1)
+
+        entropy = np.log2(count) - spread / count
+        # Five greens only when the guess is the answer, so exactly the candidates can win
+        win = np.zeros(len(matrix))
+        win[self.candidates] = 1 / count
+        if self.strategy == 'entropy':
+            # Between equally informative guesses, prefer one that could be the answer
+            scores = -(entropy + win * 1e-6)
+        else:
+            bits_left = np.log2(count) - entropy
+            scores = win + (1 - win) * (2 + TURNS_PER_BIT * bits_left)
+        if self.hard_mode:
+            scores[win == 0] = np.inf
+        return scores
+
+    def next_guess(self, game) -> str:
+        """Guess for a WordleGame, catching up with the turns played since the last call"""
+        if game.tries < len(self.history) or game.previous_words[:len(self.history)] != [g for g, _ in self.history]:
+            self.reset()
+        for turn in range(len(self.history), game.tries):
+            self.update(game.previous_words[turn], game.evaluations[turn])
+        return self.best_guess()
+
+
+def _book_file(digest: str, name: str) -> str:
+    return os.path.join(CACHE_DIR, f"book-{digest}-{name}.json")
+
+
+def _load_book(digest: str, name: str) -> Dict[str, str]:
+    """Cached guesses for the first two turns, keyed by the 'guess:pattern' history so far"""
+    key = (digest, name)
+    if key not in _books:
+        path = _book_file(digest, name)
+        book = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                book = json.load(f)
+        _books[key] = book
+    return _books[key]
+
+
+def _save_book(digest: str, name: str, book: Dict[str, str]):
+    path = _book_file(digest, name)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(book, f)
+    os.replace(temporary, path)
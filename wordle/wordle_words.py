@@ -0,0 +1,144 @@
+# Word list storage for WordleGame
+#
+# The list is cached on disk as sorted fixed-width 5 byte ASCII records with no separators, so
+# the file can be memory-mapped and word i lives at bytes [5 * i, 5 * i + 5). It is loaded once
+# per process and shared by every WordleGame. The network is only used to build or refresh the
+# cache.
+#
+# Usage:
+#   python wordle/wordle_words.py --refresh            # download the list into the cache
+#   python wordle/wordle_words.py --import words.txt   # build the cache from a local file
+
+import argparse
+import bisect
+import hashlib
+import mmap
+import os
+from typing import Iterable, Iterator, List
+
+WORDS_URL = 'https://raw.githubusercontent.com/tabatkins/wordle-list/main/words'
+WORD_LENGTH = 5
+CACHE_DIR = os.environ.get('WORDLE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'agents', 'wordle'))
+WORDS_FILE = os.path.join(CACHE_DIR, 'words.bin')
+
+_words = None
+
+
+class WordList(object):
+    """Read-only sequence of words backed by a buffer of fixed-width records (usually a memory map)"""
+
+    def __init__(self, data):
+        if len(data) % WORD_LENGTH:
+            raise ValueError(f"Word list buffer is not a multiple of {WORD_LENGTH} bytes")
+        self.data = data
+        self._digest = None
+
+    def __len__(self) -> int:
+        return len(self.data) // WORD_LENGTH
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.data[index * WORD_LENGTH:(index + 1) * WORD_LENGTH].decode('ascii')
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and self.index(word) >= 0
+
+    def index(self, word: str) -> int:
+        """Position of `word` in the (sorted) list, -1 when absent"""
+        word = word.lower()
+        position = bisect.bisect_left(self, word)
+        return position if position < len(self) and self[position] == word else -1
+
+    @property
+    def digest(self) -> str:
+        """Hash of the list contents, used to key caches derived from it"""
+        if self._digest is None:
+            self._digest = hashlib.sha1(self.data).hexdigest()[:16]
+        return self._digest
+
+
+def pack_words(words: Iterable[str]) -> bytes:
+    """Encode words as sorted, de-duplicated 5 byte records. Anything but 5 ascii letters is dropped"""
+    valid = {word.strip().lower() for word in words}
+    valid = sorted(word for word in valid if len(word) == WORD_LENGTH and word.isascii() and word.isalpha())
+    return ''.join(valid).encode('ascii')
+
+
+def save_words(words: Iterable[str], path: str = WORDS_FILE) -> int:
+    data = pack_words(words)
+    if not data:
+        raise ValueError("No valid 5-letter words to save")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+    return len(data) // WORD_LENGTH
+
+
+def fetch_words(url: str = WORDS_URL, timeout: float = 10) -> List[str]:
+    import requests
+
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.text.splitlines()
+
+
+def refresh_words(path: str = WORDS_FILE) -> int:
+    """Download the word list and rewrite the cache. Returns the number of words stored"""
+    global _words
+    count = save_words(fetch_words(), path)
+    _words = None
+    return count
+
+
+def _map_file(path: str) -> WordList:
+    with open(path, 'rb') as f:
+        # The map stays valid after the file is closed
+        return WordList(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def load_words(path: str = WORDS_FILE) -> WordList:
+    """
+    The shared word list of this process. The cache file is memory-mapped on first use and
+    downloaded first if it does not exist yet.
+    """
+    global _words
+    if _words is None:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            try:
+                refresh_words(path)
+            except Exception as e:
+                raise RuntimeError(
+                    f"No cached word list at {path} and downloading it failed ({e}). "
+                    f"Build it from a local file with: python wordle/wordle_words.py --import <words.txt>"
+                ) from e
+        _words = _map_file(path)
+    return _words
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the cached Wordle word list")
+    parser.add_argument("--refresh", action="store_true", help=f"download the list from {WORDS_URL}")
+    parser.add_argument("--import", dest="import_path", help="build the cache from a text file, one word per line")
+    args = parser.parse_args()
+
+    if args.import_path:
+        with open(args.import_path) as f:
+            print(f"Stored {save_words(f)} words in {WORDS_FILE}")
+    elif args.refresh:
+        print(f"Stored {refresh_words()} words in {WORDS_FILE}")
+    else:
+        words = load_words()
+        print(f"{len(words)} words in {WORDS_FILE} (digest {words.digest})")
+
+
+if __name__ == "__main__":
+    main()